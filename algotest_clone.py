@@ -4,11 +4,13 @@ import numpy as np
 import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
+import hashlib
 import requests
 import json
 import os
 from datetime import datetime, time, timedelta
 import io
+from time import sleep
 
 # Page configuration - Professional layout like AlgoTest
 st.set_page_config(
@@ -266,20 +268,43 @@ def check_backend_connection():
         return False
 
 def upload_file_to_backend(file, endpoint):
-    """Upload file to FastAPI backend"""
+    """Upload file to FastAPI backend, skipping the bytes if it already has them"""
     try:
-        files = {"file": (file.name, file.getvalue(), file.type)}
-        response = requests.post(f"{BACKEND_URL}/{endpoint}", files=files, timeout=30)
+        data = file.getvalue()
+        digest = hashlib.sha256(data).hexdigest()
+        known = requests.head(f"{BACKEND_URL}/{endpoint}/{digest}", timeout=10)
+        if known.status_code == 200:
+            response = requests.post(f"{BACKEND_URL}/{endpoint}/{digest}", data={"filename": file.name}, timeout=30)
+        else:
+            files = {"file": (file.name, data, file.type)}
+            response = requests.post(f"{BACKEND_URL}/{endpoint}", files=files, timeout=30)
         return response.json() if response.status_code == 200 else None
     except Exception as e:
         st.error(f"Error uploading file: {str(e)}")
         return None
 
-def run_backtest_api(config):
-    """Run backtest via API"""
+def run_backtest_api(config, poll_interval=1.0, max_wait=3600):
+    """Run backtest via the API job queue and wait for the result"""
     try:
-        response = requests.post(f"{BACKEND_URL}/backtest/run", json=config, timeout=60)
-        return response.json() if response.status_code == 200 else None
+        response = requests.post(f"{BACKEND_URL}/backtest/submit", json=config, timeout=30)
+        if response.status_code != 200:
+            return None
+        job_id = response.json()["job_id"]
+
+        deadline = datetime.now() + timedelta(seconds=max_wait)
+        while datetime.now() < deadline:
+            status = requests.get(f"{BACKEND_URL}/backtest/{job_id}/status", timeout=10).json()
+            if status["status"] == "done":
+                response = requests.get(f"{BACKEND_URL}/backtest/{job_id}/result", timeout=60)
+                return response.json() if response.status_code == 200 else None
+            if status["status"] in ("failed", "cancelled"):
+                st.error(f"Backtest {status['status']}: {status.get('error') or ''}")
+                return None
+            sleep(poll_interval)
+
+        requests.post(f"{BACKEND_URL}/backtest/{job_id}/cancel", timeout=10)
+        st.error("Backtest timed out")
+        return None
     except Exception as e:
         st.error(f"Error running backtest: {str(e)}")
         return None
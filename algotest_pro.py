@@ -4,11 +4,14 @@ import numpy as np
 import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
+import hashlib
 import requests
 import json
 import os
 from datetime import datetime, time, timedelta
 import io
+from time import sleep
+from backend.metrics import drawdown_series
 
 # Page configuration
 st.set_page_config(
@@ -466,20 +469,43 @@ def check_backend_connection():
         return False
 
 def upload_file_to_backend(file, endpoint):
-    """Upload file to FastAPI backend"""
+    """Upload file to FastAPI backend, skipping the bytes if it already has them"""
     try:
-        files = {"file": (file.name, file.getvalue(), file.type)}
-        response = requests.post(f"{BACKEND_URL}/{endpoint}", files=files, timeout=30)
+        data = file.getvalue()
+        digest = hashlib.sha256(data).hexdigest()
+        known = requests.head(f"{BACKEND_URL}/{endpoint}/{digest}", timeout=10)
+        if known.status_code == 200:
+            response = requests.post(f"{BACKEND_URL}/{endpoint}/{digest}", data={"filename": file.name}, timeout=30)
+        else:
+            files = {"file": (file.name, data, file.type)}
+            response = requests.post(f"{BACKEND_URL}/{endpoint}", files=files, timeout=30)
         return response.json() if response.status_code == 200 else None
     except Exception as e:
         st.error(f"Error uploading file: {str(e)}")
         return None
 
-def run_backtest_api(config):
-    """Run backtest via API"""
+def run_backtest_api(config, poll_interval=1.0, max_wait=3600):
+    """Run backtest via the API job queue and wait for the result"""
     try:
-        response = requests.post(f"{BACKEND_URL}/backtest/run", json=config, timeout=60)
-        return response.json() if response.status_code == 200 else None
+        response = requests.post(f"{BACKEND_URL}/backtest/submit", json=config, timeout=30)
+        if response.status_code != 200:
+            return None
+        job_id = response.json()["job_id"]
+
+        deadline = datetime.now() + timedelta(seconds=max_wait)
+        while datetime.now() < deadline:
+            status = requests.get(f"{BACKEND_URL}/backtest/{job_id}/status", timeout=10).json()
+            if status["status"] == "done":
+                response = requests.get(f"{BACKEND_URL}/backtest/{job_id}/result", timeout=60)
+                return response.json() if response.status_code == 200 else None
+            if status["status"] in ("failed", "cancelled"):
+                st.error(f"Backtest {status['status']}: {status.get('error') or ''}")
+                return None
+            sleep(poll_interval)
+
+        requests.post(f"{BACKEND_URL}/backtest/{job_id}/cancel", timeout=10)
+        st.error("Backtest timed out")
+        return None
     except Exception as e:
         st.error(f"Error running backtest: {str(e)}")
         return None
@@ -777,8 +803,11 @@ def show_strategy_builder():
         end_time = st.time_input("Market Close", value=time(15, 15))
         
         st.markdown("**📊 Technical Indicators**")
+        signal_source = st.radio("Entry Signals", ["EMA/RSI Indicators", "Uploaded Trade File"], key="signal_source")
         use_ema = st.checkbox("Use EMA", value=True)
+        ema_window = st.number_input("EMA Period", min_value=2, max_value=200, value=20, disabled=not use_ema)
         use_rsi = st.checkbox("Use RSI", value=True)
+        rsi_window = st.number_input("RSI Period", min_value=2, max_value=100, value=14, disabled=not use_rsi)
     
     # Action buttons
     st.markdown("---")
@@ -824,7 +853,12 @@ def show_strategy_builder():
                             "tax_rate": tax_rate,
                             "max_loss_per_day": max_loss,
                             "start_time": start_time.strftime("%H:%M"),
-                            "end_time": end_time.strftime("%H:%M")
+                            "end_time": end_time.strftime("%H:%M"),
+                            "signal_mode": "tradefile" if signal_source == "Uploaded Trade File" else "indicators",
+                            "use_ema": use_ema,
+                            "ema_window": int(ema_window),
+                            "use_rsi": use_rsi,
+                            "rsi_window": int(rsi_window)
                         }
                         
                         # Run backtest
@@ -908,8 +942,7 @@ def show_results_page():
             )
             
             # Drawdown calculation
-            running_max = np.maximum.accumulate(equity_curve)
-            drawdown = np.array(equity_curve) - running_max
+            drawdown = drawdown_series(equity_curve)
             
             fig.add_trace(
                 go.Scatter(
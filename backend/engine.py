@@ -0,0 +1,681 @@
+import copy
+import re
+
+import numpy as np
+
+import metrics
+from expiry import ExpiryCalendar
+from market_store import MINUTE_LABELS
+from strikes import OptionLeg
+
+
+class BacktestCancelled(Exception):
+    """Raised by ``simulate`` when its cancel event is set."""
+
+
+TIME_PATTERN = re.compile(r'(\d{1,2}):(\d{2})(?::\d{2})?')
+
+
+def minute_of_day(hhmm):
+    """Minutes since midnight of an 'HH:MM' (or 'HH:MM:SS') time string.
+
+    Raises ValueError for anything else.
+    """
+    match = TIME_PATTERN.fullmatch(str(hhmm).strip())
+    if not match or int(match.group(1)) > 23 or int(match.group(2)) > 59:
+        raise ValueError(f"Invalid time {hhmm!r}; expected HH:MM")
+    return int(match.group(1)) * 60 + int(match.group(2))
+
+
+class DayIndex:
+    """Row offsets of each trading day in a date-ordered market.
+
+    Rows ``starts[d]:ends[d]`` hold day ``d`` and ``day[k]`` is the day of row
+    ``k``. A new day starts wherever the day id changes.
+    """
+
+    def __init__(self, dates):
+        dates = np.asarray(dates)
+        n = len(dates)
+        breaks = np.flatnonzero(dates[1:] != dates[:-1]) + 1
+        self.starts = np.concatenate(([0], breaks)).astype(np.int64) if n else np.empty(0, dtype=np.int64)
+        self.ends = np.concatenate((breaks, [n])).astype(np.int64) if n else np.empty(0, dtype=np.int64)
+        self.day = np.repeat(np.arange(len(self.starts), dtype=np.int32), self.ends - self.starts)
+
+    @classmethod
+    def from_offsets(cls, starts, ends, day):
+        """A day index from the ``starts``/``ends``/``day`` arrays of an existing one."""
+        days = cls.__new__(cls)
+        days.starts, days.ends, days.day = starts, ends, day
+        return days
+
+    def __len__(self):
+        return len(self.starts)
+
+    def max_length(self):
+        """Rows in the longest day."""
+        return int((self.ends - self.starts).max()) if len(self) else 1
+
+    def row_end(self):
+        """For every row, one past the last row of its day."""
+        return self.ends[self.day]
+
+
+class MarketArrays:
+    """Contiguous NumPy columns of a preprocessed market frame.
+
+    Built once per backtest so the exit engine never touches ``DataFrame.iloc``.
+    Bar times are integers: ``day_id`` is days since 1970-01-01 and ``minute``
+    minutes since midnight; 'YYYY-MM-DD' / 'HH:MM' labels are only made when
+    trades are rendered. ``days`` partitions the rows by trading day. ``eod_index[k]`` is the first row of
+    the same day at or after ``k`` whose time is at or past ``end_time`` (or
+    the day's last row when it closes before that), so no trade ever scans
+    past its own session. ``extrema`` answers first-passage queries on
+    Low/High in O(log day length). Only ``eod_index`` depends on ``end_time``:
+    ``for_end_time`` reuses everything else for another session end.
+    ``parts``/``from_parts`` move a built index to another process without
+    recomputing it.
+    """
+
+    def __init__(self, high, low, close, day_id, minute, end_time, days=None, eod_index=None, extrema=None):
+        self.high = np.ascontiguousarray(high, dtype=np.float64)
+        self.low = np.ascontiguousarray(low, dtype=np.float64)
+        self.close = np.ascontiguousarray(close, dtype=np.float64)
+        self.day_id = np.ascontiguousarray(day_id, dtype=np.int32)
+        self.minute = np.ascontiguousarray(minute, dtype=np.int16)
+        self.end_time = end_time
+        self.days = DayIndex(self.day_id) if days is None else days
+        self.day_labels = np.datetime_as_string(self.trading_days(), unit='D').astype(object)
+        if eod_index is None:
+            eod_index = build_eod_index(self.minute, minute_of_day(end_time), self.days)
+        self.eod_index = eod_index
+        if extrema is None:
+            # Deep enough for a whole day, so it serves every session end
+            extrema = RangeExtremaIndex(self.low, self.high, self.days.max_length())
+        self.extrema = extrema
+        # Expiries and other sessions' arrays, shared with every for_end_time sibling
+        self._derived = {'sessions': {}}
+
+    def trading_days(self):
+        """``datetime64[D]`` date of every trading day."""
+        return self.day_id[self.days.starts].astype('datetime64[D]')
+
+    def date_labels(self, rows):
+        """'YYYY-MM-DD' date of the given rows."""
+        return self.day_labels[self.days.day[rows]]
+
+    def time_labels(self, rows):
+        """'HH:MM' time of the given rows."""
+        return MINUTE_LABELS[self.minute[rows]]
+
+    @property
+    def expiry_calendar(self):
+        """Expiry calendar of the trading days in this market, built on first use."""
+        if 'expiry_calendar' not in self._derived:
+            self._derived['expiry_calendar'] = ExpiryCalendar(self.trading_days())
+        return self._derived['expiry_calendar']
+
+    def day_expiries(self, mode):
+        """Expiry date ('YYYY-MM-DD', or None past the calendar) of every trading day."""
+        key = ('expiries', mode)
+        if key not in self._derived:
+            resolved = self.expiry_calendar.resolve(self.trading_days(), mode)
+            labels = np.datetime_as_string(resolved, unit='D').astype(object)
+            labels[np.isnat(resolved)] = None
+            self._derived[key] = labels
+        return self._derived[key]
+
+    def trade_expiries(self, entry_index, mode):
+        """Expiry of trades entered on the given rows."""
+        return self.day_expiries(mode)[self.days.day[entry_index]]
+
+    @classmethod
+    def from_columns(cls, market, end_time):
+        """Arrays over a dict of market columns; float64 price columns are used without copying."""
+        return cls(market['High'], market['Low'], market['Close'], market['DayId'], market['Minute'], end_time)
+
+    def for_end_time(self, end_time):
+        """These arrays with the session ending at ``end_time``.
+
+        Only the end-of-day index is built; the columns, day and extrema
+        indexes are shared. The result is kept, so later backtests with the
+        same session end reuse it.
+        """
+        end_minute = minute_of_day(end_time)
+        if end_minute == minute_of_day(self.end_time):
+            return self
+        sessions = self._derived['sessions']
+        if end_minute not in sessions:
+            arrays = copy.copy(self)
+            arrays.end_time = end_time
+            arrays.eod_index = build_eod_index(self.minute, end_minute, self.days)
+            sessions[end_minute] = arrays
+        return sessions[end_minute]
+
+    def parts(self):
+        """Every array of this index by name, for ``from_parts``."""
+        parts = {
+            'high': self.high,
+            'low': self.low,
+            'close': self.close,
+            'day_id': self.day_id,
+            'minute': self.minute,
+            'day_starts': self.days.starts,
+            'day_ends': self.days.ends,
+            'day': self.days.day,
+            'eod_index': self.eod_index,
+        }
+        for k in range(1, len(self.extrema.min_levels)):
+            parts[f'min_{k}'] = self.extrema.min_levels[k]
+            parts[f'max_{k}'] = self.extrema.max_levels[k]
+        return parts
+
+    @classmethod
+    def from_parts(cls, parts, end_time):
+        """Arrays over ``parts()`` of an index built with the same ``end_time``."""
+        levels = range(1, sum(name.startswith('min_') for name in parts) + 1)
+        return cls(
+            parts['high'], parts['low'], parts['close'], parts['day_id'], parts['minute'], end_time,
+            days=DayIndex.from_offsets(parts['day_starts'], parts['day_ends'], parts['day']),
+            eod_index=parts['eod_index'],
+            extrema=RangeExtremaIndex.from_levels(
+                [parts['low']] + [parts[f'min_{k}'] for k in levels],
+                [parts['high']] + [parts[f'max_{k}'] for k in levels],
+            ),
+        )
+
+    def __len__(self):
+        return len(self.close)
+
+
+def build_eod_index(minutes, end_minute, days):
+    """For every row, the index of its day's end-of-day bar (inclusive)."""
+    n = len(minutes)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    idx = np.where(minutes >= end_minute, np.arange(n), days.row_end() - 1)
+    # Every candidate lies inside its own day, so a reverse running minimum
+    # never reaches across a day boundary
+    return np.minimum.accumulate(idx[::-1])[::-1].astype(np.int64)
+
+
+class RangeExtremaIndex:
+    """Sparse tables of range-min over Low and range-max over High.
+
+    Level ``k`` holds the extremum of every window ``[p, p + 2**k)``. Only the
+    levels needed to cover ``max_span`` bars are built, so with session-bounded
+    trades the table stays a handful of levels deep even on years of data.
+    """
+
+    def __init__(self, low, high, max_span):
+        self.min_levels = [low]
+        self.max_levels = [high]
+        for k in range(1, max(1, int(max_span).bit_length())):
+            half = 1 << (k - 1)
+            prev_min, prev_max = self.min_levels[-1], self.max_levels[-1]
+            if len(prev_min) <= half:
+                break
+            self.min_levels.append(np.minimum(prev_min[:-half], prev_min[half:]))
+            self.max_levels.append(np.maximum(prev_max[:-half], prev_max[half:]))
+
+    @classmethod
+    def from_levels(cls, min_levels, max_levels):
+        """An index over already built levels."""
+        extrema = cls.__new__(cls)
+        extrema.min_levels, extrema.max_levels = list(min_levels), list(max_levels)
+        return extrema
+
+    def first_low_at_most(self, lo, hi, value):
+        """First index in ``[lo, hi)`` with Low <= value, or ``hi`` if none."""
+        p = lo
+        for k in range(len(self.min_levels) - 1, -1, -1):
+            step = 1 << k
+            if p + step <= hi and self.min_levels[k][p] > value:
+                p += step
+        return p
+
+    def first_high_at_least(self, lo, hi, value):
+        """First index in ``[lo, hi)`` with High >= value, or ``hi`` if none."""
+        p = lo
+        for k in range(len(self.max_levels) - 1, -1, -1):
+            step = 1 << k
+            if p + step <= hi and self.max_levels[k][p] < value:
+                p += step
+        return p
+
+
+def find_exit(arrays, entry_index, direction, entry_price, sl_price, target_price,
+              trigger_pct=None, lock_pct=None):
+    """Find the first bar after ``entry_index`` that closes the trade.
+
+    Exits are checked per bar in the same order as the original row loop:
+    stop loss, trailing stop, target, then end of day. Returns a dict with
+    ``exit_index``, ``exit_price``, ``trail_price`` (None unless the trail was
+    active on the exit bar) and ``max_profit_pct``, or None when there are no
+    bars left in the entry's session.
+    """
+    start = entry_index + 1
+    days = arrays.days
+    if start >= days.ends[days.day[entry_index]]:
+        return None
+    stop = int(arrays.eod_index[start]) + 1
+    trailing = bool(trigger_pct and lock_pct)
+    if not trailing:
+        return _find_fixed_exit(arrays, start, stop, direction, sl_price, target_price)
+
+    # Trailing stops are path dependent, so scan the session window directly
+    high = arrays.high[start:stop]
+    low = arrays.low[start:stop]
+    if direction == 'LONG':
+        sl_hit = low <= sl_price
+        target_hit = high >= target_price
+        best = np.maximum.accumulate(high)
+        profit = (best - entry_price) / entry_price
+        trail = best * (1 - lock_pct)
+        trail_hit = low <= trail
+    else:
+        sl_hit = high >= sl_price
+        target_hit = low <= target_price
+        best = np.minimum.accumulate(low)
+        profit = (entry_price - best) / entry_price
+        trail = best * (1 + lock_pct)
+        trail_hit = high >= trail
+
+    # The trail only arms on a new profit high that clears the trigger
+    active = (profit > 0) & (profit >= trigger_pct)
+    trail_hit &= active
+    hit = sl_hit | trail_hit | target_hit
+    hit[-1] = True  # the end-of-day bar always closes the trade
+
+    k = int(np.argmax(hit))
+    if sl_hit[k]:
+        exit_price = sl_price
+    elif trail_hit[k]:
+        exit_price = trail[k]
+    elif target_hit[k]:
+        exit_price = target_price
+    else:
+        exit_price = arrays.close[start + k]
+
+    return {
+        'exit_index': start + k,
+        'exit_price': float(exit_price),
+        'trail_price': float(trail[k]) if active[k] else None,
+        'max_profit_pct': max(0.0, float(profit[k])),
+    }
+
+
+def _find_fixed_exit(arrays, start, stop, direction, sl_price, target_price):
+    """SL/target first passage via the range-extrema index in O(log N)."""
+    extrema = arrays.extrema
+    if direction == 'LONG':
+        sl_index = extrema.first_low_at_most(start, stop, sl_price)
+        target_index = extrema.first_high_at_least(start, stop, target_price)
+    else:
+        sl_index = extrema.first_high_at_least(start, stop, sl_price)
+        target_index = extrema.first_low_at_most(start, stop, target_price)
+
+    # Stop loss wins ties with the target on the same bar
+    if sl_index < stop and sl_index <= target_index:
+        exit_index, exit_price = sl_index, sl_price
+    elif target_index < stop:
+        exit_index, exit_price = target_index, target_price
+    else:
+        exit_index = stop - 1
+        exit_price = arrays.close[exit_index]
+
+    return {
+        'exit_index': exit_index,
+        'exit_price': float(exit_price),
+        'trail_price': None,
+        'max_profit_pct': 0.0,
+    }
+
+
+class Trade:
+    """One closed trade. Dates and times are looked up from the market arrays."""
+
+    __slots__ = (
+        'entry_index', 'exit_index', 'direction', 'entry_price', 'exit_price',
+        'entry_price_with_slippage', 'exit_price_with_slippage', 'sl', 'target',
+        'trail_price', 'gross_pnl', 'brokerage', 'tax', 'pnl', 'max_profit_pct',
+    )
+
+    def __init__(self, **fields):
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+    def to_dict(self, arrays, position_size, expiry_mode=None, option_leg=None):
+        """The legacy 18-key trade record, plus any expiry/option-leg fields."""
+        record = {
+            'trade_type': f'Entry {self.direction.lower()}',
+            'entry_price': self.entry_price,
+            'exit_price': self.exit_price,
+            'entry_price_with_slippage': self.entry_price_with_slippage,
+            'exit_price_with_slippage': self.exit_price_with_slippage,
+            'sl': self.sl,
+            'target': self.target,
+            'trail_price': self.trail_price,
+            'gross_pnl': self.gross_pnl,
+            'brokerage': self.brokerage,
+            'tax': self.tax,
+            'pnl': self.pnl,
+            'date': arrays.date_labels(self.entry_index),
+            'time': arrays.time_labels(self.entry_index),
+            'exit_time': arrays.time_labels(self.exit_index),
+            'max_profit_pct': self.max_profit_pct,
+            'position_size': position_size,
+            'direction': self.direction,
+        }
+        direction = 1 if self.direction == 'LONG' else -1
+        extras = option_columns(arrays, np.array([self.entry_index]), np.array([direction]), expiry_mode, option_leg)
+        record.update((name, values.tolist()[0]) for name, values in extras.items())
+        return record
+
+
+def option_columns(arrays, entry_index, direction, expiry_mode=None, option_leg=None):
+    """Per-trade ``expiry`` and option-leg columns, resolved for all trades at once.
+
+    Empty unless ``expiry_mode`` is set; the leg's strike and ticker are
+    added when ``option_leg`` is given too.
+    """
+    if not expiry_mode:
+        return {}
+    expiries = arrays.trade_expiries(entry_index, expiry_mode)
+    columns = {'expiry': expiries}
+    if option_leg is not None:
+        columns.update(option_leg.resolve(arrays.close[entry_index], direction, expiries))
+    return columns
+
+
+class TradeLog:
+    """Struct-of-arrays trade log backed by preallocated NumPy columns.
+
+    Prices and P&L live in one float64 block (``trail_price`` is NaN when the
+    trail never armed); entry/exit bars are stored as row indexes into the
+    market arrays and direction as +1/-1. Expiries and option legs are
+    resolved from the entry bars when the log is rendered.
+    """
+
+    FLOAT_COLUMNS = (
+        'entry_price', 'exit_price', 'entry_price_with_slippage', 'exit_price_with_slippage',
+        'sl', 'target', 'trail_price', 'gross_pnl', 'brokerage', 'tax', 'pnl', 'max_profit_pct',
+    )
+
+    def __init__(self, capacity, position_size, expiry_mode=None, option_leg=None):
+        capacity = max(int(capacity), 1)
+        self.position_size = position_size
+        self.expiry_mode = expiry_mode
+        self.option_leg = option_leg
+        self.size = 0
+        self._floats = np.empty((len(self.FLOAT_COLUMNS), capacity), dtype=np.float64)
+        self._entry_index = np.empty(capacity, dtype=np.int64)
+        self._exit_index = np.empty(capacity, dtype=np.int64)
+        self._direction = np.empty(capacity, dtype=np.int8)
+
+    def __len__(self):
+        return self.size
+
+    def append(self, trade):
+        i = self.size
+        if i == self._floats.shape[1]:
+            self._grow()
+        self._floats[:, i] = [
+            np.nan if getattr(trade, name) is None else getattr(trade, name)
+            for name in self.FLOAT_COLUMNS
+        ]
+        self._entry_index[i] = trade.entry_index
+        self._exit_index[i] = trade.exit_index
+        self._direction[i] = 1 if trade.direction == 'LONG' else -1
+        self.size += 1
+
+    def _grow(self):
+        # Copy the filled part of every column into blocks twice the size
+        capacity = self._floats.shape[1] * 2
+        floats = np.empty((len(self.FLOAT_COLUMNS), capacity), dtype=np.float64)
+        floats[:, :self.size] = self._floats[:, :self.size]
+        self._floats = floats
+        for name in ('_entry_index', '_exit_index', '_direction'):
+            old = getattr(self, name)
+            grown = np.empty(capacity, dtype=old.dtype)
+            grown[:self.size] = old[:self.size]
+            setattr(self, name, grown)
+
+    def column(self, name):
+        """View of one float column, trimmed to the trades taken."""
+        return self._floats[self.FLOAT_COLUMNS.index(name), :self.size]
+
+    @property
+    def entry_index(self):
+        return self._entry_index[:self.size]
+
+    @property
+    def exit_index(self):
+        return self._exit_index[:self.size]
+
+    @property
+    def direction(self):
+        return self._direction[:self.size]
+
+    def __getstate__(self):
+        # Ship only the used rows between processes
+        return {
+            'position_size': self.position_size,
+            'expiry_mode': self.expiry_mode,
+            'option_leg': self.option_leg,
+            'size': self.size,
+            '_floats': self._floats[:, :self.size].copy(),
+            '_entry_index': self.entry_index.copy(),
+            '_exit_index': self.exit_index.copy(),
+            '_direction': self.direction.copy(),
+        }
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.size == 0:
+            self.__init__(1, self.position_size, self.expiry_mode, self.option_leg)
+
+    def to_columns(self, arrays):
+        """Column-wise dict of lists for the ``columnar`` response layout."""
+        columns = {}
+        for name in self.FLOAT_COLUMNS:
+            values = self.column(name)
+            if name == 'trail_price':
+                columns[name] = [None if v != v else v for v in values.tolist()]
+            else:
+                columns[name] = values.tolist()
+        columns['date'] = arrays.date_labels(self.entry_index).tolist()
+        columns['time'] = arrays.time_labels(self.entry_index).tolist()
+        columns['exit_time'] = arrays.time_labels(self.exit_index).tolist()
+        columns['direction'] = np.where(self.direction > 0, 'LONG', 'SHORT').tolist()
+        extras = option_columns(arrays, self.entry_index, self.direction, self.expiry_mode, self.option_leg)
+        for name, values in extras.items():
+            columns[name] = values.tolist()
+        return columns
+
+    def trades(self):
+        """Iterate the log as ``Trade`` records."""
+        columns = [self.column(name).tolist() for name in self.FLOAT_COLUMNS]
+        entries, exits = self.entry_index.tolist(), self.exit_index.tolist()
+        directions = self.direction.tolist()
+        for k in range(self.size):
+            trade = Trade(entry_index=entries[k], exit_index=exits[k],
+                          direction='LONG' if directions[k] > 0 else 'SHORT')
+            for name, values in zip(self.FLOAT_COLUMNS, columns):
+                setattr(trade, name, values[k])
+            if trade.trail_price != trade.trail_price:
+                trade.trail_price = None
+            yield trade
+
+    def to_records(self, arrays):
+        """The legacy list of 18-key trade dicts, plus any expiry/option-leg fields."""
+        records = [trade.to_dict(arrays, self.position_size) for trade in self.trades()]
+        extras = option_columns(arrays, self.entry_index, self.direction, self.expiry_mode, self.option_leg)
+        for name, values in extras.items():
+            for record, value in zip(records, values.tolist()):
+                record[name] = value
+        return records
+
+
+def session_mask(arrays, config):
+    """Bars between the config's start and end time, inclusive."""
+    start = minute_of_day(getattr(config, 'start_time', '09:15'))
+    end = minute_of_day(getattr(config, 'end_time', '15:15'))
+    return (arrays.minute >= start) & (arrays.minute <= end)
+
+
+def build_signals(arrays, config, indicators):
+    """EMA/RSI entry signal masks over ``arrays``.
+
+    ``indicators`` maps 'EMA'/'RSI' to columns aligned with ``arrays``; only
+    the ones enabled by ``use_ema``/``use_rsi`` are read. Bars where an
+    enabled indicator is still warming up (NaN) never signal, and with both
+    disabled there are no signals at all.
+    """
+    use_ema = getattr(config, 'use_ema', True)
+    use_rsi = getattr(config, 'use_rsi', True)
+
+    in_session = session_mask(arrays, config)
+    if not (use_ema or use_rsi):
+        no_signals = np.zeros(len(arrays), dtype=bool)
+        return no_signals, no_signals.copy()
+
+    long_signals = in_session.copy()
+    short_signals = in_session.copy()
+    if use_ema:
+        ema = indicators['EMA']
+        long_signals &= ema < arrays.close
+        short_signals &= ema > arrays.close
+    if use_rsi:
+        rsi = indicators['RSI']
+        long_signals &= rsi > 50
+        short_signals &= rsi < 50
+    return long_signals, short_signals
+
+
+def simulate(config, arrays, long_signals, short_signals, cancel_event=None):
+    """Run the trade loop over precomputed signal bars.
+
+    Returns ``(trade_log, equity_curve)`` where ``trade_log`` is a columnar
+    ``TradeLog``. The arrays and signals are only read, so one set
+    can be shared by many configs with the same session window. Raises
+    ``BacktestCancelled`` if ``cancel_event`` is set while the loop runs.
+    """
+    # Every signal bar opens at most one trade per direction
+    capacity = int(np.count_nonzero(long_signals)) + int(np.count_nonzero(short_signals))
+    trade_log = TradeLog(capacity, getattr(config, 'position_size', 100),
+                         getattr(config, 'expiry_mode', None), OptionLeg.from_config(config))
+    for trade in iter_trades(config, arrays, long_signals, short_signals, cancel_event):
+        trade_log.append(trade)
+    equity_curve = metrics.equity_curve(trade_log.column('pnl')).tolist()
+    return trade_log, equity_curve
+
+
+def iter_trades(config, arrays, long_signals, short_signals, cancel_event=None):
+    """Yield each ``Trade`` as soon as it is closed, in entry order."""
+    reentry_tracker = {}
+    daily_pnl = {}  # day id -> P&L so far, for the daily loss limit
+
+    # Get configuration parameters
+    position_size = getattr(config, 'position_size', 100)
+    slippage = getattr(config, 'slippage', 0.5)
+    brokerage = getattr(config, 'brokerage', 20.0)
+    tax_rate = getattr(config, 'tax_rate', 15.0) / 100
+    max_loss_per_day = getattr(config, 'max_loss_per_day', 5000.0)
+
+    trigger_pct = config.trail_trigger / 100 if config.trail_trigger else None
+    lock_pct = config.trail_lock / 100 if config.trail_lock else None
+
+    for n, i in enumerate(np.flatnonzero(long_signals | short_signals)):
+        if cancel_event is not None and n % 256 == 0 and cancel_event.is_set():
+            raise BacktestCancelled()
+        i = int(i)
+        day_id = int(arrays.day_id[i])
+        close = float(arrays.close[i])
+
+        # Check for both LONG and SHORT opportunities
+        for direction in ['LONG', 'SHORT']:
+            if (direction == 'LONG' and not long_signals[i]) or (direction == 'SHORT' and not short_signals[i]):
+                continue
+
+            # Check reentry conditions
+            key = (day_id, direction)
+            if key in reentry_tracker:
+                if reentry_tracker[key]['count'] >= config.reentry_count:
+                    continue
+                if config.reentry_mode == 'RE-DELAYED':
+                    if i < reentry_tracker[key]['next_entry']:
+                        continue
+
+            # Initialize trade parameters
+            entry_price = close
+            sl_price = entry_price * (1 - config.sl_pct / 100) if direction == 'LONG' else entry_price * (1 + config.sl_pct / 100)
+            target_price = entry_price * (1 + config.target_pct / 100) if direction == 'LONG' else entry_price * (1 - config.target_pct / 100)
+
+            # Simulate trade: first SL / trail / target / end-of-day bar
+            outcome = find_exit(arrays, i, direction, entry_price, sl_price, target_price, trigger_pct, lock_pct)
+            if outcome is None:
+                continue  # No bars left after the entry
+            exit_price = outcome['exit_price']
+            trail_price = outcome['trail_price']
+            max_profit_pct = outcome['max_profit_pct']
+
+            # Apply slippage
+            if direction == 'LONG':
+                entry_price_with_slippage = entry_price + slippage
+                exit_price_with_slippage = exit_price - slippage
+            else:
+                entry_price_with_slippage = entry_price - slippage
+                exit_price_with_slippage = exit_price + slippage
+
+            # Calculate gross PnL
+            gross_pnl = (exit_price_with_slippage - entry_price_with_slippage) * position_size if direction == 'LONG' else (entry_price_with_slippage - exit_price_with_slippage) * position_size
+            
+            # Apply trading costs
+            total_brokerage = brokerage * 2  # Entry + Exit
+            tax_amount = max(0, gross_pnl) * tax_rate if gross_pnl > 0 else 0
+            net_pnl = gross_pnl - total_brokerage - tax_amount
+            
+            # Check daily loss limit
+            day_pnl = daily_pnl.get(day_id, 0)
+            if day_pnl + net_pnl < -max_loss_per_day:
+                continue  # Skip this trade if it exceeds daily loss limit
+            
+            daily_pnl[day_id] = day_pnl + net_pnl
+
+            yield Trade(
+                entry_index=i,
+                exit_index=outcome['exit_index'],
+                direction=direction,
+                entry_price=entry_price,
+                exit_price=exit_price,
+                entry_price_with_slippage=entry_price_with_slippage,
+                exit_price_with_slippage=exit_price_with_slippage,
+                sl=sl_price,
+                target=target_price,
+                trail_price=trail_price,
+                gross_pnl=gross_pnl,
+                brokerage=total_brokerage,
+                tax=tax_amount,
+                pnl=net_pnl,
+                max_profit_pct=max_profit_pct * 100,
+            )
+
+            # Update reentry tracker
+            if key not in reentry_tracker:
+                reentry_tracker[key] = {'count': 1, 'next_entry': i + 1}
+            else:
+                reentry_tracker[key]['count'] += 1
+                reentry_tracker[key]['next_entry'] = i + config.reentry_delay if config.reentry_delay else i + 1
+
+
+def summarize(trade_log, arrays):
+    """Summary statistics for a simulated ``TradeLog``, with P&L per entry date."""
+    pnl = trade_log.column('pnl')
+    return metrics.summarize_pnl(
+        pnl,
+        trade_log.column('gross_pnl'),
+        trade_log.column('brokerage'),
+        trade_log.column('tax'),
+        metrics.daily_pnl(arrays.date_labels(trade_log.entry_index), pnl),
+    )
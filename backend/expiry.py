@@ -0,0 +1,63 @@
+import numpy as np
+
+EXPIRY_MODES = ('weekly', 'monthly')
+THURSDAY = 3
+
+
+def weekday(days):
+    """Monday=0 weekday of ``datetime64[D]`` values (1970-01-01 was a Thursday)."""
+    return (np.asarray(days, dtype='datetime64[D]').astype(np.int64) + THURSDAY) % 7
+
+
+class ExpiryCalendar:
+    """Sorted weekly and monthly expiry dates of one dataset.
+
+    Nominal expiries fall on ``expiry_weekday`` (Thursday); monthly ones on
+    the last such day of the month. An expiry that lands on a day missing
+    from ``trading_days`` (a holiday) moves back to the previous trading day
+    of the same week, and a week without one has no expiry. Expiries after
+    the data ends cannot be checked and stay on the nominal day.
+    """
+
+    def __init__(self, trading_days, expiry_weekday=THURSDAY):
+        days = np.unique(np.asarray(trading_days, dtype='datetime64[D]'))
+        self.expiry_weekday = expiry_weekday
+        if len(days) == 0:
+            self.weekly = self.monthly = np.empty(0, dtype='datetime64[D]')
+            return
+
+        # Every nominal expiry from the first trading day to the end of the
+        # month after the last one, so the final trades still resolve
+        first = days[0] + np.timedelta64(int((expiry_weekday - weekday(days[0])) % 7), 'D')
+        horizon = (days[-1].astype('datetime64[M]') + 2).astype('datetime64[D]')
+        nominal = np.arange(first, horizon, np.timedelta64(7, 'D'))
+        months = nominal.astype('datetime64[M]')
+        month_end = np.append(months[1:] != months[:-1], True)
+
+        self.weekly = self._shift_holidays(nominal, days)
+        self.monthly = self._shift_holidays(nominal[month_end], days)
+
+    def _shift_holidays(self, nominal, days):
+        pos = np.searchsorted(days, nominal, side='right') - 1
+        previous = days[np.maximum(pos, 0)]
+        week_start = nominal - np.timedelta64(self.expiry_weekday, 'D')
+        checked = nominal <= days[-1]
+        keep = ~checked | ((pos >= 0) & (previous >= week_start))
+        return np.where(checked, previous, nominal)[keep]
+
+    def expiries(self, mode):
+        if mode == 'weekly':
+            return self.weekly
+        if mode == 'monthly':
+            return self.monthly
+        raise ValueError(f"expiry_mode must be one of {list(EXPIRY_MODES)}")
+
+    def resolve(self, dates, mode):
+        """Nearest expiry on or after each date (NaT past the calendar)."""
+        expiries = self.expiries(mode)
+        dates = np.asarray(dates, dtype='datetime64[D]')
+        idx = np.searchsorted(expiries, dates, side='left')
+        found = idx < len(expiries)
+        resolved = np.full(dates.shape, np.datetime64('NaT'), dtype='datetime64[D]')
+        resolved[found] = expiries[idx[found]]
+        return resolved
@@ -0,0 +1,111 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+INDICATOR_DIR = "indicators"
+
+
+def ewm_mean(values, min_periods, **decay):
+    """Recursive exponential mean, ``y[t] = (1 - alpha) * y[t-1] + alpha * x[t]``.
+
+    ``decay`` is ``span=`` or ``alpha=`` as for ``ewm``; the result is NaN
+    until ``min_periods`` values have been seen.
+    """
+    return (
+        pd.Series(values, copy=False)
+        .ewm(min_periods=min_periods, adjust=False, **decay)
+        .mean()
+        .to_numpy(dtype=np.float64)
+    )
+
+
+def ema(close, window):
+    """Exponential moving average, identical to ``ta.trend.EMAIndicator``."""
+    return ewm_mean(close, window, span=window)
+
+
+def rsi(close, window):
+    """Wilder's RSI, identical to ``ta.momentum.RSIIndicator``."""
+    diff = np.diff(np.asarray(close, dtype=np.float64), prepend=np.nan)
+    up = np.where(diff > 0, diff, 0.0)
+    down = np.where(diff < 0, -diff, 0.0)
+    ema_up = ewm_mean(up, window, alpha=1.0 / window)
+    ema_down = ewm_mean(down, window, alpha=1.0 / window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = 100 - 100 / (1 + ema_up / ema_down)
+    return np.where(ema_down == 0, 100.0, values)
+
+
+# Indicator name -> fn(close, window)
+INDICATORS = {
+    'EMA': ema,
+    'RSI': rsi,
+}
+
+
+class IndicatorCache:
+    """Indicator columns keyed by (file hash, indicator, window).
+
+    Columns are kept in a small in-memory LRU and persisted as ``.npy`` files
+    in the market's columnar store, so they survive restarts and disappear
+    when the store is re-ingested. Returned arrays are read-only.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (digest, name, window) -> column
+        self._lock = threading.Lock()
+
+    def get(self, digest, store_dir, name, window, close):
+        """Column of indicator ``name`` over ``close``, computing it on a miss."""
+        if name not in INDICATORS:
+            raise ValueError(f"Unknown indicator: {name}")
+        window = int(window)
+        if window < 1:
+            raise ValueError(f"{name} window must be at least 1")
+
+        key = (digest, name, window)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        path = os.path.join(store_dir, INDICATOR_DIR, f"{name}_{window}_{digest[:16]}.npy")
+        column = self._load(path, len(close))
+        if column is None:
+            column = INDICATORS[name](close, window)
+            column.setflags(write=False)
+            self._save(path, column)
+
+        with self._lock:
+            self._entries[key] = column
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return column
+
+    @staticmethod
+    def _load(path, rows):
+        try:
+            column = np.load(path, mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+        return column if len(column) == rows else None
+
+    @staticmethod
+    def _save(path, column):
+        # Best effort: the store may be re-ingested underneath us
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                np.save(f, column)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -1,13 +1,28 @@
+import itertools
+import json
+import math
 import os
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import FastAPI, Form, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-import pandas as pd
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import ValidationError
+import numpy as np
 from db import save_strategy, get_strategy
-from models import BacktestConfig, BacktestResult
-from typing import Optional
-from ta.trend import EMAIndicator
-from ta.momentum import RSIIndicator
+from models import BacktestConfig, BacktestResult, ColumnarBacktestResult, ParamRange, SweepConfig, SweepResult
+from engine import MarketArrays, TradeLog, build_signals, iter_trades, minute_of_day, simulate, summarize
+from expiry import EXPIRY_MODES
+from strikes import OptionLeg
+from indicators import IndicatorCache
+from market_cache import MarketCache, columns_nbytes
+from market_store import PRICE_COLUMNS, MarketIngest, check_market_header, ingest_market_csv, open_market_store, write_market_store
+from trade_signals import align_signals, read_signal_file
+from parallel import run_groups, shutdown_executor, simulate_configs
+from jobs import DONE, JobQueue
+from uploads import (EXCEL_MAGIC, MULTIPART_OVERHEAD_BYTES, UPLOAD_CHUNK_BYTES, AliasTable, CsvHeaderCheck,
+                     MagicCheck, MultipartFile, StreamedUpload, UploadTooLarge, blob_name, check_trade_header,
+                     is_digest, upload_name)
+from typing import List, Optional, Union
 
 # App setup
 app = FastAPI()
@@ -23,332 +38,547 @@ app.add_middleware(
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 TRADE_DIR = os.path.join(BASE_DIR, "data", "trades")
 MARKET_DIR = os.path.join(BASE_DIR, "data", "market")
+COLUMN_DIR = os.path.join(BASE_DIR, "data", "columnar")
 
 os.makedirs(TRADE_DIR, exist_ok=True)
 os.makedirs(MARKET_DIR, exist_ok=True)
+os.makedirs(COLUMN_DIR, exist_ok=True)
+
+# Worker processes for sweeps and batches (1 disables the pool)
+BACKTEST_WORKERS = int(os.environ.get("BACKTEST_WORKERS", str(os.cpu_count() or 1)))
+PARALLEL_MIN_CONFIGS = int(os.environ.get("PARALLEL_MIN_CONFIGS", "8"))
+
+# Background backtest jobs
+JOB_CONCURRENCY = int(os.environ.get("JOB_CONCURRENCY", "2"))
+job_queue = JobQueue(JOB_CONCURRENCY)
+
+# Parsed market data cache (memory budget in MB)
+MARKET_CACHE_MB = int(os.environ.get("MARKET_CACHE_MB", "1024"))
+market_cache = MarketCache(MARKET_CACHE_MB * 1024 * 1024, sizeof=lambda arrays: columns_nbytes(arrays.parts()))
+
+# Session end the cached market arrays are built for (the BacktestConfig default)
+DEFAULT_END_TIME = '15:15'
+
+# Indicator columns, also persisted next to the columnar market store
+indicator_cache = IndicatorCache()
+
+# Parsed trade-signal files, keyed by content like the market cache
+signal_cache = MarketCache(64 * 1024 * 1024)
+
+# Upload size limits (MB)
+MAX_TRADEFILE_MB = int(os.environ.get("MAX_TRADEFILE_MB", "50"))
+MAX_MARKETFILE_MB = int(os.environ.get("MAX_MARKETFILE_MB", "4096"))
+
+# Build the columnar store while market data is still arriving (0 ingests after the upload)
+STREAM_INGEST = os.environ.get("STREAM_INGEST", "1") != "0"
+
+TRADE_EXTENSIONS = ('.csv', '.xlsx', '.xls')
+MARKET_EXTENSIONS = ('.csv',)
+
+def checked_upload_name(filename, extensions):
+    try:
+        return upload_name(filename, extensions)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Uploads are stored once per content hash; file names are aliases for them
+trade_aliases = AliasTable(os.path.join(TRADE_DIR, "aliases.json"))
+market_aliases = AliasTable(os.path.join(MARKET_DIR, "aliases.json"))
+
+UPLOAD_KINDS = {
+    "tradefile": (TRADE_DIR, TRADE_EXTENSIONS, trade_aliases),
+    "marketdata": (MARKET_DIR, MARKET_EXTENSIONS, market_aliases),
+}
+
+def upload_kind(kind):
+    if kind not in UPLOAD_KINDS:
+        raise HTTPException(status_code=404, detail=f"Unknown upload kind {kind!r}")
+    return UPLOAD_KINDS[kind]
+
+def find_blob(directory, extensions, digest):
+    """Name of the stored content with hash ``digest``, or None."""
+    if not is_digest(digest):
+        raise HTTPException(status_code=400, detail="Expected a lowercase hex SHA-256")
+    for extension in extensions:
+        name = blob_name(digest, extension)
+        if os.path.exists(os.path.join(directory, name)):
+            return name
+    return None
 
-# Upload endpoints
+def resolve_upload(directory, aliases, filename):
+    """Path of the content ``filename`` refers to, and its hash when known.
+
+    Names without an alias are looked up in ``directory`` directly, for
+    files placed there by hand or uploaded before content addressing.
+    """
+    blob = aliases.get(filename)
+    if blob is None:
+        return os.path.join(directory, filename), None
+    return os.path.join(directory, blob), os.path.splitext(blob)[0]
+
+async def receive_upload(request, directory, extensions, max_mb, sinks_for, label):
+    """Stream the ``file`` field of a multipart request into ``directory`` under its content hash.
+
+    The body is parsed as it arrives, so the size limit and the checks of
+    ``sinks_for(filename)`` reject a bad upload while it is still being
+    sent. Returns (filename, path, upload, stored); content that is already
+    on the server is not written again and ``stored`` is False. Oversized
+    uploads fail with 413 and rejected ones with 400.
+    """
+    max_bytes = max_mb * 1024 * 1024
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > max_bytes + MULTIPART_OVERHEAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"File exceeds the {max_mb} MB upload limit")
+    try:
+        form = MultipartFile(request.headers.get("content-type", ""))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    upload = None
+    pending = bytearray()
+    try:
+        async for chunk in request.stream():
+            pending += form.feed(chunk)
+            if upload is None and form.filename is not None:
+                filename = checked_upload_name(form.filename, extensions)
+                upload = StreamedUpload(directory, max_bytes, sinks_for(filename))
+            if len(pending) >= UPLOAD_CHUNK_BYTES or (pending and upload.size + len(pending) > max_bytes):
+                await run_in_threadpool(upload.write, bytes(pending))
+                pending.clear()
+        form.finish()
+        if pending:
+            await run_in_threadpool(upload.write, bytes(pending))
+        extension = os.path.splitext(filename)[1].lower()
+        file_path = os.path.join(directory, blob_name(upload.digest, extension))
+        stored = not os.path.exists(file_path)
+        if stored:
+            await run_in_threadpool(upload.commit, file_path)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"{label}: {e}")
+    finally:
+        if upload is not None:
+            upload.abort()
+    return filename, file_path, upload, stored
+
+# Upload endpoints: multipart/form-data with the file in a ``file`` field
 @app.post("/upload/tradefile")
-async def upload_tradefile(file: UploadFile = File(...)):
-    file_path = os.path.join(TRADE_DIR, file.filename)
-    with open(file_path, "wb") as f:
-        f.write(await file.read())
-    return {"filename": file.filename}
+async def upload_tradefile(request: Request):
+    def sinks_for(filename):
+        extension = os.path.splitext(filename)[1].lower()
+        if extension in EXCEL_MAGIC:
+            return [MagicCheck(EXCEL_MAGIC[extension], "Excel")]
+        return [CsvHeaderCheck(check_trade_header)]
+
+    filename, file_path, upload, _ = await receive_upload(
+        request, TRADE_DIR, TRADE_EXTENSIONS, MAX_TRADEFILE_MB, sinks_for, "Invalid trade file")
+    trade_aliases.set(filename, os.path.basename(file_path))
+    return {"filename": filename, "size": upload.size, "sha256": upload.digest}
 
 @app.post("/upload/marketdata")
-async def upload_marketdata(file: UploadFile = File(...)):
-    file_path = os.path.join(MARKET_DIR, file.filename)
-    with open(file_path, "wb") as f:
-        f.write(await file.read())
-    return {"filename": file.filename}
-
-# Utility functions
-def calculate_strike(spot: float, n: int, kind: str) -> float:
-    atm = round(spot / 50) * 50
-    if kind == 'ATM':
-        return atm
-    elif kind == 'OTM':
-        return atm + (50 * n)
-    elif kind == 'ITM':
-        return atm - (50 * n)
-    else:
-        return atm
-
-def get_expiry(date, expiry_mode, market_df):
-    date = pd.to_datetime(date, dayfirst=True)
-    if expiry_mode == 'weekly':
-        thursdays = market_df[market_df['Date'].apply(lambda d: pd.to_datetime(d, dayfirst=True).weekday() == 3)]
-        next_thurs = thursdays[thursdays['Date'] >= date.strftime('%d/%m/%Y')]['Date'].unique()
-        return next_thurs[0] if len(next_thurs) > 0 else None
-    elif expiry_mode == 'monthly':
-        month = date.month
-        thursdays = market_df[market_df['Date'].apply(lambda d: pd.to_datetime(d, dayfirst=True).weekday() == 3 and pd.to_datetime(d, dayfirst=True).month == month)]
-        if not thursdays.empty:
-            return thursdays['Date'].iloc[-1]
-    return None
-
-def calculate_max_consecutive(trade_log, type_):
-    """Calculate maximum consecutive wins or losses"""
-    if not trade_log:
-        return 0
-    
-    max_consecutive = 0
-    current_consecutive = 0
-    
-    for trade in trade_log:
-        if type_ == 'win' and trade['pnl'] > 0:
-            current_consecutive += 1
-            max_consecutive = max(max_consecutive, current_consecutive)
-        elif type_ == 'loss' and trade['pnl'] <= 0:
-            current_consecutive += 1
-            max_consecutive = max(max_consecutive, current_consecutive)
-        else:
-            current_consecutive = 0
-    
-    return max_consecutive
-
-# Backtest engine
-@app.post("/backtest/run", response_model=BacktestResult)
-def run_backtest(config: BacktestConfig):
-    trade_path = os.path.join(TRADE_DIR, config.tradefile)
-    market_path = os.path.join(MARKET_DIR, config.marketfile)
+async def upload_marketdata(request: Request):
+    # Parse at upload time so backtests can memory-map the columns
+    def sinks_for(filename):
+        if STREAM_INGEST:
+            return [MarketIngest()]
+        return [CsvHeaderCheck(check_market_header)]
+
+    filename, file_path, upload, stored = await receive_upload(
+        request, MARKET_DIR, MARKET_EXTENSIONS, MAX_MARKETFILE_MB, sinks_for, "Invalid market data")
+    if stored:
+        store_dir = column_store_path(file_path)
+        try:
+            if STREAM_INGEST:
+                await run_in_threadpool(write_market_store, upload.sinks[0].columns, file_path, store_dir)
+            else:
+                await run_in_threadpool(ingest_market_csv, file_path, store_dir)
+        except (KeyError, ValueError) as e:
+            os.remove(file_path)
+            raise HTTPException(status_code=400, detail=f"Invalid market data: {e}")
+    market_aliases.set(filename, os.path.basename(file_path))
+    return {"filename": filename, "size": upload.size, "sha256": upload.digest}
+
+@app.head("/upload/{kind}/{sha256}")
+def has_upload(kind: str, sha256: str):
+    """200 when content with this hash is already stored, so the client can skip sending it."""
+    directory, extensions, _ = upload_kind(kind)
+    if find_blob(directory, extensions, sha256) is None:
+        raise HTTPException(status_code=404, detail="Content not found")
+
+@app.post("/upload/{kind}/{sha256}")
+def alias_upload(kind: str, sha256: str, filename: str = Form(...)):
+    """Point ``filename`` at already stored content instead of uploading it again."""
+    directory, extensions, aliases = upload_kind(kind)
+    filename = checked_upload_name(filename, extensions)
+    blob = find_blob(directory, extensions, sha256)
+    if blob is None:
+        raise HTTPException(status_code=404, detail="Content not found")
+    aliases.set(filename, blob)
+    return {"filename": filename, "size": os.path.getsize(os.path.join(directory, blob)), "sha256": sha256}
+
+def column_store_path(market_path):
+    return os.path.join(COLUMN_DIR, os.path.basename(market_path))
+
+def load_market(market_path):
+    """Exit-engine arrays over the memory-mapped columnar store.
+
+    The day and extrema indexes are built here, once per file; each session
+    end only adds its end-of-day index (``MarketArrays.for_end_time``). Rows
+    with a missing price are dropped (indicators are computed on what
+    remains); only files that have such rows are copied out of the mapping.
+    """
+    columns = open_market_store(market_path, column_store_path(market_path))
+    market = {
+        'DayId': columns['Date'].view(np.int64),
+        'Minute': columns['Minute'],
+        **{name: columns[name] for name in PRICE_COLUMNS},
+    }
+    missing = np.zeros(len(market['Close']), dtype=bool)
+    for name in PRICE_COLUMNS:
+        missing |= np.isnan(market[name])
+    if missing.any():
+        market = {name: values[~missing] for name, values in market.items()}
+    return MarketArrays.from_columns(market, DEFAULT_END_TIME)
+
+def trade_file_path(config):
+    trade_path, digest = resolve_upload(TRADE_DIR, trade_aliases, config.tradefile)
+    if digest is not None and os.path.exists(trade_path):
+        signal_cache.remember_digest(trade_path, digest)
+    return trade_path
+
+def market_file_path(config):
+    market_path, digest = resolve_upload(MARKET_DIR, market_aliases, config.marketfile)
+    if digest is not None and os.path.exists(market_path):
+        market_cache.remember_digest(market_path, digest)
+    return market_path
+
+def get_backtest_market(config):
+    trade_path = trade_file_path(config)
+    market_path = market_file_path(config)
 
     if not os.path.exists(trade_path) or not os.path.exists(market_path):
         raise HTTPException(status_code=404, detail="File not found")
 
-    # Read and preprocess market data
-    market = pd.read_csv(market_path)
-    market.columns = [c.strip() for c in market.columns]
-    
-    # Convert date and time
-    market['Date'] = pd.to_datetime(market['Date'], dayfirst=True).dt.strftime('%Y-%m-%d')
-    market['Time'] = pd.to_datetime(market['Time'], format='%H:%M:%S').dt.strftime('%H:%M')
-    
-    # Convert price columns to numeric, handling commas
-    price_columns = ['Open', 'High', 'Low', 'Close']
-    for col in price_columns:
-        market[col] = market[col].astype(str).str.replace(',', '').astype(float)
-
-    # Add technical indicators
-    market['EMA20'] = EMAIndicator(close=market['Close'], window=20).ema_indicator()
-    market['RSI'] = RSIIndicator(close=market['Close'], window=14).rsi()
-    
-    # Drop rows with NaN values from indicators
-    market.dropna(inplace=True)
-
-    trade_log = []
-    equity_curve = []
-    balance = 0
-    daily_pnl = {}
-    reentry_tracker = {}
-
-    # Get configuration parameters
-    position_size = getattr(config, 'position_size', 100)
-    slippage = getattr(config, 'slippage', 0.5)
-    brokerage = getattr(config, 'brokerage', 20.0)
-    tax_rate = getattr(config, 'tax_rate', 15.0) / 100
-    max_loss_per_day = getattr(config, 'max_loss_per_day', 5000.0)
-
-    # Time filter setup
-    start_time = getattr(config, 'start_time', '09:15')
-    end_time = getattr(config, 'end_time', '15:15')
-
-    for i in range(len(market)):
-        row = market.iloc[i]
-        date, time = row['Date'], row['Time']
-
-        # Apply time filter
-        if time < start_time or time > end_time:
-            continue
-
-        # Get technical indicator values
-        ema = row['EMA20']
-        rsi = row['RSI']
-        close = row['Close']
-
-        # Generate signals
-        long_signal = ema < close and rsi > 50
-        short_signal = ema > close and rsi < 50
-
-        if not long_signal and not short_signal:
-            continue
-
-        # Check for both LONG and SHORT opportunities
-        for direction in ['LONG', 'SHORT']:
-            if (direction == 'LONG' and not long_signal) or (direction == 'SHORT' and not short_signal):
-                continue
-
-            # Check reentry conditions
-            key = f"{date}_{direction}"
-            if key in reentry_tracker:
-                if reentry_tracker[key]['count'] >= config.reentry_count:
-                    continue
-                if config.reentry_mode == 'RE-DELAYED':
-                    if i < reentry_tracker[key]['next_entry']:
-                        continue
-
-            # Initialize trade parameters
-            entry_price = close
-            sl_price = entry_price * (1 - config.sl_pct / 100) if direction == 'LONG' else entry_price * (1 + config.sl_pct / 100)
-            target_price = entry_price * (1 + config.target_pct / 100) if direction == 'LONG' else entry_price * (1 - config.target_pct / 100)
-            
-            trail_active = False
-            trail_price = None
-            trigger_pct = config.trail_trigger / 100 if config.trail_trigger else None
-            lock_pct = config.trail_lock / 100 if config.trail_lock else None
-            max_profit_pct = 0
-
-            # Simulate trade
-            for j in range(i + 1, len(market)):
-                fut = market.iloc[j]
-                fut_high = fut['High']
-                fut_low = fut['Low']
-                fut_time = fut['Time']
-
-                if direction == 'LONG':
-                    # Check for trailing stop activation
-                    if trigger_pct and lock_pct:
-                        curr_profit_pct = (fut_high - entry_price) / entry_price
-                        if curr_profit_pct > max_profit_pct:
-                            max_profit_pct = curr_profit_pct
-                            if not trail_active and curr_profit_pct >= trigger_pct:
-                                trail_active = True
-                                trail_price = fut_high * (1 - lock_pct)
-                            elif trail_active:
-                                new_trail = fut_high * (1 - lock_pct)
-                                if new_trail > trail_price:
-                                    trail_price = new_trail
-
-                    # Check exit conditions
-                    if fut_low <= sl_price:
-                        exit_price = sl_price
-                        break
-                    elif trail_active and fut_low <= trail_price:
-                        exit_price = trail_price
-                        break
-                    elif fut_high >= target_price:
-                        exit_price = target_price
-                        break
-
-                else:  # SHORT
-                    # Check for trailing stop activation
-                    if trigger_pct and lock_pct:
-                        curr_profit_pct = (entry_price - fut_low) / entry_price
-                        if curr_profit_pct > max_profit_pct:
-                            max_profit_pct = curr_profit_pct
-                            if not trail_active and curr_profit_pct >= trigger_pct:
-                                trail_active = True
-                                trail_price = fut_low * (1 + lock_pct)
-                            elif trail_active:
-                                new_trail = fut_low * (1 + lock_pct)
-                                if new_trail < trail_price:
-                                    trail_price = new_trail
-
-                    # Check exit conditions
-                    if fut_high >= sl_price:
-                        exit_price = sl_price
-                        break
-                    elif trail_active and fut_high >= trail_price:
-                        exit_price = trail_price
-                        break
-                    elif fut_low <= target_price:
-                        exit_price = target_price
-                        break
-
-                # Check if we've reached end of day
-                if fut_time >= end_time:
-                    exit_price = fut['Close']
-                    break
-
-            # If no exit triggered, use close price
-            if 'exit_price' not in locals():
-                exit_price = market.iloc[j]['Close']
-
-            # Apply slippage
-            if direction == 'LONG':
-                entry_price_with_slippage = entry_price + slippage
-                exit_price_with_slippage = exit_price - slippage
-            else:
-                entry_price_with_slippage = entry_price - slippage
-                exit_price_with_slippage = exit_price + slippage
-
-            # Calculate gross PnL
-            gross_pnl = (exit_price_with_slippage - entry_price_with_slippage) * position_size if direction == 'LONG' else (entry_price_with_slippage - exit_price_with_slippage) * position_size
-            
-            # Apply trading costs
-            total_brokerage = brokerage * 2  # Entry + Exit
-            tax_amount = max(0, gross_pnl) * tax_rate if gross_pnl > 0 else 0
-            net_pnl = gross_pnl - total_brokerage - tax_amount
-            
-            # Check daily loss limit
-            current_date = date
-            if current_date not in daily_pnl:
-                daily_pnl[current_date] = 0
-            
-            if daily_pnl[current_date] + net_pnl < -max_loss_per_day:
-                continue  # Skip this trade if it exceeds daily loss limit
-            
-            daily_pnl[current_date] += net_pnl
-            balance += net_pnl
-
-            # Log trade with detailed information
-            trade_log.append({
-                'trade_type': f'Entry {direction.lower()}',
-                'entry_price': entry_price,
-                'exit_price': exit_price,
-                'entry_price_with_slippage': entry_price_with_slippage,
-                'exit_price_with_slippage': exit_price_with_slippage,
-                'sl': sl_price,
-                'target': target_price,
-                'trail_price': trail_price if trail_active else None,
-                'gross_pnl': gross_pnl,
-                'brokerage': total_brokerage,
-                'tax': tax_amount,
-                'pnl': net_pnl,
-                'date': date,
-                'time': time,
-                'exit_time': fut_time,
-                'max_profit_pct': max_profit_pct * 100,
-                'position_size': position_size,
-                'direction': direction
-            })
-            equity_curve.append(balance)
-
-            # Update reentry tracker
-            if key not in reentry_tracker:
-                reentry_tracker[key] = {'count': 1, 'next_entry': i + 1}
-            else:
-                reentry_tracker[key]['count'] += 1
-                reentry_tracker[key]['next_entry'] = i + config.reentry_delay if config.reentry_delay else i + 1
-
-    # Calculate summary statistics
-    winning_trades = [t for t in trade_log if t['pnl'] > 0]
-    losing_trades = [t for t in trade_log if t['pnl'] <= 0]
-    
-    # Calculate additional metrics
-    total_gross_pnl = sum(t['gross_pnl'] for t in trade_log) if trade_log else 0
-    total_brokerage = sum(t['brokerage'] for t in trade_log) if trade_log else 0
-    total_tax = sum(t['tax'] for t in trade_log) if trade_log else 0
-    
-    # Calculate maximum consecutive wins/losses
-    max_consecutive_wins = calculate_max_consecutive(trade_log, 'win')
-    max_consecutive_losses = calculate_max_consecutive(trade_log, 'loss')
-    
-    # Calculate Sharpe ratio (simplified)
-    if len(equity_curve) > 1:
-        returns = [equity_curve[i] - equity_curve[i-1] for i in range(1, len(equity_curve))]
-        avg_return = sum(returns) / len(returns) if returns else 0
-        std_return = (sum((r - avg_return) ** 2 for r in returns) / len(returns)) ** 0.5 if returns else 0
-        sharpe_ratio = (avg_return / std_return) * (252 ** 0.5) if std_return > 0 else 0
+    # Market arrays and indexes, shared across requests (read-only)
+    return market_path, market_cache.get(market_path, load_market)
+
+# Config fields that change the entry signals, beyond the session window
+SIGNAL_MODES = ('indicators', 'tradefile')
+SIGNAL_FIELDS = ('signal_mode', 'use_ema', 'ema_window', 'use_rsi', 'rsi_window')
+
+def signal_key(config):
+    """Configs with equal keys (on the same market and session) share signals."""
+    key = tuple(getattr(config, f) for f in SIGNAL_FIELDS)
+    return key + ((trade_file_path(config),) if config.signal_mode == 'tradefile' else ())
+
+def get_indicators(config, market_path, market):
+    """Indicator columns enabled by ``config``, from the indicator cache."""
+    digest = market_cache.digest(market_path)
+    store_dir = column_store_path(market_path)
+    close = market.close
+    wanted = []
+    if config.use_ema:
+        wanted.append(('EMA', config.ema_window))
+    if config.use_rsi:
+        wanted.append(('RSI', config.rsi_window))
+    try:
+        return {
+            name: indicator_cache.get(digest, store_dir, name, window, close)
+            for name, window in wanted
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def get_file_signals(config, arrays):
+    """Entry masks from the uploaded trade file, as-of joined onto the bars."""
+    trade_path = trade_file_path(config)
+    try:
+        signals = signal_cache.get(trade_path, read_signal_file)
+        return align_signals(arrays, config, signals['Timestamp'].to_numpy(), signals['Direction'].to_numpy())
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid trade file: {e}")
+
+def validate_config(config):
+    """Raise 400 for settings a backtest cannot run with.
+
+    Called for every config of a batch or sweep, not just the one whose
+    arrays and signals are prepared.
+    """
+    for field in ('start_time', 'end_time'):
+        try:
+            minute_of_day(getattr(config, field))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"{field}: {e}")
+    if config.signal_mode not in SIGNAL_MODES:
+        raise HTTPException(status_code=400, detail=f"signal_mode must be one of {list(SIGNAL_MODES)}")
+    if config.expiry_mode is not None and config.expiry_mode not in EXPIRY_MODES:
+        raise HTTPException(status_code=400, detail=f"expiry_mode must be one of {list(EXPIRY_MODES)}")
+    if config.strike_kind is not None:
+        if config.expiry_mode is None:
+            raise HTTPException(status_code=400, detail="strike_kind needs an expiry_mode to build option tickers")
+        try:
+            OptionLeg.from_config(config)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+def prepare_backtest(config, arrays=None):
+    """Exit-engine arrays plus entry signals for ``config``.
+
+    Pass ``arrays`` to reuse them for another config on the same market file
+    and session window.
+    """
+    validate_config(config)
+    market_path, market = get_backtest_market(config)
+    if arrays is None:
+        arrays = market.for_end_time(config.end_time)
+    if config.signal_mode == 'tradefile':
+        long_signals, short_signals = get_file_signals(config, arrays)
     else:
-        sharpe_ratio = 0
-    
-    summary = {
-        'total_pnl': balance,
-        'total_gross_pnl': total_gross_pnl,
-        'total_brokerage': total_brokerage,
-        'total_tax': total_tax,
-        'num_trades': len(trade_log),
-        'winning_trades': len(winning_trades),
-        'losing_trades': len(losing_trades),
-        'win_rate': len(winning_trades) / len(trade_log) if trade_log else 0,
-        'avg_win': sum(t['pnl'] for t in winning_trades) / len(winning_trades) if winning_trades else 0,
-        'avg_loss': sum(t['pnl'] for t in losing_trades) / len(losing_trades) if losing_trades else 0,
-        'max_drawdown': min(equity_curve) if equity_curve else 0,
-        'profit_factor': abs(sum(t['pnl'] for t in winning_trades) / sum(t['pnl'] for t in losing_trades)) if losing_trades else float('inf'),
-        'max_consecutive_wins': max_consecutive_wins,
-        'max_consecutive_losses': max_consecutive_losses,
-        'sharpe_ratio': sharpe_ratio,
-        'total_return_pct': (balance / 100000) * 100 if balance else 0,  # Assuming initial capital of 1 lakh
-        'daily_pnl_stats': daily_pnl
-    }
+        long_signals, short_signals = build_signals(arrays, config, get_indicators(config, market_path, market))
+    return arrays, long_signals, short_signals
 
+# Backtest engine
+TRADE_LOG_LAYOUTS = ("records", "columnar")
+
+def build_result(trade_log, equity_curve, summary, arrays, layout="records"):
+    if layout == "columnar":
+        return ColumnarBacktestResult(
+            summary=summary,
+            trade_log=trade_log.to_columns(arrays),
+            equity_curve=equity_curve,
+            position_size=trade_log.position_size,
+        )
     return BacktestResult(
         summary=summary,
-        trade_log=trade_log,
+        trade_log=trade_log.to_records(arrays),
         equity_curve=equity_curve
     )
 
+def execute_backtest(config, cancel_event=None, layout="records"):
+    arrays, long_signals, short_signals = prepare_backtest(config)
+    trade_log, equity_curve = simulate(config, arrays, long_signals, short_signals, cancel_event)
+    summary = summarize(trade_log, arrays)
+    return build_result(trade_log, equity_curve, summary, arrays, layout)
+
+# Streaming output: one record per trade, then a final summary record
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+STREAM_BATCH_SIZE = 200
+
+def finite_or_none(value):
+    """``value`` with NaN/inf floats replaced by None, as the JSON responses render them."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: finite_or_none(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [finite_or_none(item) for item in value]
+    return value
+
+def encode_stream_record(record, stream):
+    line = json.dumps(finite_or_none(record), allow_nan=False)
+    return f"data: {line}\n\n" if stream == "sse" else line + "\n"
+
+def stream_backtest(config, arrays, long_signals, short_signals, stream):
+    """Yield encoded trade records as the engine closes them.
+
+    Trades are only kept in the compact columnar log needed for the summary,
+    never as dicts, so memory stays small while the response streams.
+    """
+    capacity = int(np.count_nonzero(long_signals)) + int(np.count_nonzero(short_signals))
+    trade_log = TradeLog(capacity, config.position_size, config.expiry_mode, OptionLeg.from_config(config))
+    chunk = []
+    for trade in iter_trades(config, arrays, long_signals, short_signals):
+        trade_log.append(trade)
+        record = {'type': 'trade', **trade.to_dict(arrays, config.position_size, config.expiry_mode, trade_log.option_leg)}
+        chunk.append(encode_stream_record(record, stream))
+        if len(chunk) >= STREAM_BATCH_SIZE:
+            yield "".join(chunk)
+            chunk = []
+    summary = summarize(trade_log, arrays)
+    chunk.append(encode_stream_record({'type': 'summary', 'summary': summary}, stream))
+    yield "".join(chunk)
+
+@app.post("/backtest/run", response_model=Union[BacktestResult, ColumnarBacktestResult])
+def run_backtest(config: BacktestConfig, stream: Optional[str] = None, layout: str = "records"):
+    """Run a backtest.
+
+    ``?layout=columnar`` returns the trade log as one list per field;
+    ``?stream=ndjson`` or ``?stream=sse`` streams it trade by trade instead.
+    """
+    if layout not in TRADE_LOG_LAYOUTS:
+        raise HTTPException(status_code=400, detail=f"layout must be one of {list(TRADE_LOG_LAYOUTS)}")
+    if stream is None:
+        return execute_backtest(config, layout=layout)
+    if stream not in STREAM_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"stream must be one of {sorted(STREAM_MEDIA_TYPES)}")
+
+    arrays, long_signals, short_signals = prepare_backtest(config)
+    return StreamingResponse(
+        stream_backtest(config, arrays, long_signals, short_signals, stream),
+        media_type=STREAM_MEDIA_TYPES[stream],
+    )
+
+# Background jobs
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.post("/backtest/submit")
+def submit_backtest(config: BacktestConfig):
+    job = job_queue.submit(execute_backtest, config)
+    return {"job_id": job.id, "status": job.status}
+
+@app.get("/backtest/{job_id}/status")
+def backtest_status(job_id: str):
+    return get_job(job_id).info()
+
+@app.get("/backtest/{job_id}/result", response_model=BacktestResult)
+def backtest_result(job_id: str):
+    job = get_job(job_id)
+    if job.status != DONE:
+        detail = f"Job is {job.status}" + (f": {job.error}" if job.error else "")
+        raise HTTPException(status_code=409, detail=detail)
+    return job.result
+
+@app.post("/backtest/{job_id}/cancel")
+def cancel_backtest(job_id: str):
+    get_job(job_id)
+    return job_queue.cancel(job_id).info()
+
+# Parameter sweep: anything but the files and session window. Variants that
+# share signal settings share one set of signals.
+SWEEPABLE_FIELDS = {
+    'sl_pct', 'target_pct', 'trail_trigger', 'trail_lock', 'reentry_count',
+    'reentry_mode', 'reentry_delay', 'position_size', 'slippage', 'brokerage',
+    'tax_rate', 'max_loss_per_day', *SIGNAL_FIELDS,
+}
+SWEEP_SUMMARY_KEYS = [
+    'total_pnl', 'num_trades', 'win_rate', 'avg_win', 'avg_loss', 'max_drawdown',
+    'profit_factor', 'max_consecutive_losses', 'sharpe_ratio', 'sortino_ratio', 'total_return_pct',
+]
+MAX_SWEEP_COMBINATIONS = int(os.environ.get("MAX_SWEEP_COMBINATIONS", "5000"))
+
+def expand_grid(sweep):
+    """List of parameter dicts for every combination in the sweep grid."""
+    unknown = set(sweep.grid) - SWEEPABLE_FIELDS
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Cannot sweep: {sorted(unknown)}")
+    if sweep.rank_by not in SWEEP_SUMMARY_KEYS:
+        raise HTTPException(status_code=400, detail=f"rank_by must be one of {SWEEP_SUMMARY_KEYS}")
+
+    # Size the grid from the range bounds first, so an oversized one is
+    # rejected without building its values
+    total = 1
+    for name, axis in sweep.grid.items():
+        try:
+            count = axis.count() if isinstance(axis, ParamRange) else len(axis)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"{name}: {e}")
+        if count == 0:
+            raise HTTPException(status_code=400, detail=f"{name}: no values to sweep")
+        total *= count
+    if total > MAX_SWEEP_COMBINATIONS:
+        raise HTTPException(status_code=400, detail=f"Sweep has {total} combinations (max {MAX_SWEEP_COMBINATIONS})")
+
+    names = list(sweep.grid)
+    axes = [v.values() if isinstance(v, ParamRange) else v for v in sweep.grid.values()]
+    return [dict(zip(names, combo)) for combo in itertools.product(*axes)]
+
+def rank_sweep_results(results, rank_by, descending=True):
+    """Sort sweep rows by a summary metric, NaN last."""
+    def key(row):
+        value = row['summary'][rank_by]
+        if value is None or value != value:
+            return (1, 0)
+        return (0, -value if descending else value)
+    return sorted(results, key=key)
+
+def use_pool(num_configs):
+    return BACKTEST_WORKERS > 1 and num_configs >= PARALLEL_MIN_CONFIGS
+
+def simulate_groups(groups, full=False):
+    """Results of every ``(arrays, long_signals, short_signals, configs)`` group.
+
+    The pool is used when the configs of all groups together are enough
+    work for it, and then every group runs at once.
+    """
+    if use_pool(sum(len(configs) for *_, configs in groups)):
+        return run_groups(groups, BACKTEST_WORKERS, full)
+    return [simulate_configs(*group, full=full) for group in groups]
+
+def group_by_signals(configs):
+    """Indices of ``configs`` grouped by their signal settings, in first-seen order."""
+    groups = {}
+    for index, config in enumerate(configs):
+        groups.setdefault(signal_key(config), []).append(index)
+    return list(groups.values())
+
+@app.post("/backtest/sweep", response_model=SweepResult)
+def run_sweep(sweep: SweepConfig):
+    combos = expand_grid(sweep)
+    base = sweep.base.dict()
+    configs = []
+    for params in combos:
+        try:
+            configs.append(BacktestConfig(**{**base, **params}))
+        except ValidationError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid sweep values {params}: {e}")
+        validate_config(configs[-1])
+
+    # The exit index is shared by every variant, signals by each indicator setting
+    arrays = None
+    index_groups = group_by_signals(configs)
+    groups = []
+    for indices in index_groups:
+        group = [configs[i] for i in indices]
+        arrays, long_signals, short_signals = prepare_backtest(group[0], arrays)
+        groups.append((arrays, long_signals, short_signals, group))
+
+    summaries = [None] * len(configs)
+    for indices, outputs in zip(index_groups, simulate_groups(groups)):
+        for i, summary in zip(indices, outputs):
+            summaries[i] = summary
+    results = [
+        {'params': params, 'summary': {k: summary[k] for k in SWEEP_SUMMARY_KEYS}}
+        for params, summary in zip(combos, summaries)
+    ]
+
+    ranked = rank_sweep_results(results, sweep.rank_by, sweep.descending)
+    if sweep.top_n:
+        ranked = ranked[:sweep.top_n]
+    return SweepResult(rank_by=sweep.rank_by, num_combinations=len(combos), results=ranked)
+
+@app.post("/backtest/batch", response_model=List[BacktestResult])
+def run_batch(configs: List[BacktestConfig]):
+    """Run several configs, possibly on different market files, across the pool."""
+    # Configs sharing a market file, session window and signal settings
+    # share one set of arrays and signals
+    index_groups = {}
+    for index, config in enumerate(configs):
+        validate_config(config)
+        index_groups.setdefault((market_file_path(config), config.start_time, config.end_time) + signal_key(config), []).append(index)
+
+    groups = []
+    for indices in index_groups.values():
+        group = [configs[i] for i in indices]
+        for config in group[1:]:
+            get_backtest_market(config)  # 404 on a missing trade file
+        groups.append((*prepare_backtest(group[0]), group))
+
+    results = [None] * len(configs)
+    for indices, (arrays, *_), outputs in zip(index_groups.values(), groups, simulate_groups(groups, full=True)):
+        for i, (summary, trade_log, equity_curve) in zip(indices, outputs):
+            results[i] = build_result(trade_log, equity_curve, summary, arrays)
+    return results
+
+@app.on_event("shutdown")
+def stop_workers():
+    job_queue.shutdown()
+    shutdown_executor()
+
 # Save/load strategy
 @app.post("/strategy/save")
 def save_strategy_endpoint(name: str = Form(...), config: str = Form(...)):
@@ -0,0 +1,109 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's contents, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def frame_nbytes(df):
+    """Approximate in-memory size of a DataFrame, including object columns."""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def is_mapped(values):
+    """Whether ``values`` is a memory-mapped array or a view of one."""
+    while isinstance(values, np.ndarray):
+        if isinstance(values, np.memmap):
+            return True
+        values = values.base
+    return False
+
+
+def columns_nbytes(columns):
+    """Process memory held by a dict of arrays; memory-mapped columns live in the page cache."""
+    return sum(values.nbytes for values in columns.values() if not is_mapped(values))
+
+
+class MarketCache:
+    """Thread-safe LRU cache of preprocessed market data, bounded by bytes.
+
+    Entries are keyed by the SHA-256 of the file contents, so renaming or
+    re-uploading identical data reuses the parsed frame. A file is only
+    re-hashed when its mtime or size changes. Cached values are shared between
+    requests and must be treated as read-only.
+    """
+
+    def __init__(self, max_bytes, sizeof=frame_nbytes):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries = OrderedDict()  # digest -> (value, nbytes)
+        self._digests = {}  # path -> (mtime_ns, size, digest)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def digest(self, path):
+        """Content hash of ``path``, memoized on (mtime, size)."""
+        st = os.stat(path)
+        with self._lock:
+            known = self._digests.get(path)
+        if known and known[0] == st.st_mtime_ns and known[1] == st.st_size:
+            return known[2]
+        digest = file_digest(path)
+        with self._lock:
+            self._digests[path] = (st.st_mtime_ns, st.st_size, digest)
+        return digest
+
+    def remember_digest(self, path, digest):
+        """Record a content hash of ``path`` computed elsewhere, e.g. while it was uploaded."""
+        st = os.stat(path)
+        with self._lock:
+            self._digests[path] = (st.st_mtime_ns, st.st_size, digest)
+
+    def get(self, path, loader):
+        """Return the cached value for ``path``, calling ``loader(path)`` on a miss."""
+        key = self.digest(path)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+
+        value = loader(path)
+        nbytes = self.sizeof(value)
+        if nbytes > self.max_bytes:
+            return value  # Too large to cache; serve it uncached
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (value, nbytes)
+                self._bytes += nbytes
+                self._evict()
+            return self._entries[key][0] if key in self._entries else value
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._entries:
+            _, (_, nbytes) = self._entries.popitem(last=False)
+            self._bytes -= nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._digests.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,169 @@
+import io
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+REQUIRED_COLUMNS = ['Date', 'Time'] + PRICE_COLUMNS
+META_FILE = "meta.json"
+
+# 'HH:MM' label for every minute of the day, indexed by minute-of-day
+MINUTE_LABELS = np.array([f"{m // 60:02d}:{m % 60:02d}" for m in range(24 * 60)], dtype=object)
+
+
+def map_unique(values, parse):
+    """``parse`` applied to each distinct value of ``values`` once, mapped back to every row.
+
+    Dates and times repeat on every bar of a day, so this parses a few
+    thousand strings instead of millions.
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    return np.asarray(parse(uniques))[codes]
+
+
+def parse_dates(values, dayfirst=True):
+    """``datetime64[ns]`` of date strings, with the format inferred from the first value."""
+    return map_unique(values, lambda uniques: pd.to_datetime(uniques, dayfirst=dayfirst).to_numpy())
+
+
+def parse_minutes(values):
+    """int16 minute of day of 'HH:MM:SS' strings."""
+    def minutes(uniques):
+        times = pd.to_datetime(uniques, format='%H:%M:%S')
+        return (times.hour * 60 + times.minute).to_numpy(dtype=np.int16)
+    return map_unique(values, minutes)
+
+
+def check_market_header(columns):
+    """Raise ValueError unless a market CSV header has every required column."""
+    missing = [c for c in REQUIRED_COLUMNS if c not in [str(c).strip() for c in columns]]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+
+def parse_market_csv(csv_path):
+    """Parse a raw market CSV into normalized NumPy columns.
+
+    Prices become float64 with thousands separators stripped, ``Date`` becomes
+    ``datetime64[D]`` (the CSV is day-first) and ``Time`` becomes an int16
+    minute-of-day.
+    """
+    return parse_market_frame(pd.read_csv(csv_path))
+
+
+def parse_market_frame(raw):
+    """parse_market_csv for rows already read into a DataFrame."""
+    raw.columns = [c.strip() for c in raw.columns]
+
+    columns = {}
+    for col in PRICE_COLUMNS:
+        columns[col] = raw[col].astype(str).str.replace(',', '').astype(float).to_numpy(dtype=np.float64)
+    columns['Date'] = parse_dates(raw['Date']).astype('datetime64[D]')
+    columns['Minute'] = parse_minutes(raw['Time'])
+    return columns
+
+
+def ingest_market_csv(csv_path, store_dir):
+    """Parse ``csv_path`` and persist it as one ``.npy`` file per column."""
+    return write_market_store(parse_market_csv(csv_path), csv_path, store_dir)
+
+
+def write_market_store(columns, csv_path, store_dir):
+    """Persist parsed ``columns`` of ``csv_path`` as the store in ``store_dir``."""
+    st = os.stat(csv_path)
+
+    tmp_dir = store_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name, values in columns.items():
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), values)
+    with open(os.path.join(tmp_dir, META_FILE), "w") as f:
+        json.dump({
+            "source_size": st.st_size,
+            "source_mtime_ns": st.st_mtime_ns,
+            "rows": len(columns['Close']),
+            "columns": sorted(columns),
+        }, f)
+
+    shutil.rmtree(store_dir, ignore_errors=True)
+    os.replace(tmp_dir, store_dir)
+    return store_dir
+
+
+class MarketIngest:
+    """Incremental ingest of a market CSV that is still being received.
+
+    ``feed`` takes raw byte chunks as they arrive; every complete line is
+    parsed straight away, so a bad header or row fails the upload early and
+    the columns are ready as soon as the last chunk lands. ``finish`` keeps
+    them as ``columns`` and, given a ``store_dir``, writes the store once the
+    CSV is complete on disk.
+    """
+
+    def __init__(self, store_dir=None):
+        self.store_dir = store_dir
+        self.columns = None
+        self._header = None
+        self._pending = b""
+        self._parts = []
+
+    def feed(self, chunk):
+        self._pending += chunk
+        end = self._pending.rfind(b"\n")
+        if end < 0:
+            return
+        lines, self._pending = self._pending[:end + 1], self._pending[end + 1:]
+        if self._header is None:
+            header_end = lines.index(b"\n") + 1
+            self._header, lines = lines[:header_end], lines[header_end:]
+            check_market_header(pd.read_csv(io.BytesIO(self._header), nrows=0).columns)
+        if lines.strip():
+            self._parse(lines)
+
+    def _parse(self, lines):
+        self._parts.append(parse_market_frame(pd.read_csv(io.BytesIO(self._header + lines))))
+
+    def finish(self, csv_path):
+        """Parse any trailing partial line and write the store for ``csv_path``, if any."""
+        if self._header is None:
+            self._header, self._pending = self._pending, b""
+            check_market_header(pd.read_csv(io.BytesIO(self._header), nrows=0).columns)
+        if self._pending.strip():
+            self._parse(self._pending)
+            self._pending = b""
+        if not self._parts:
+            self._parts.append(parse_market_frame(pd.read_csv(io.BytesIO(self._header))))
+        self.columns = {name: np.concatenate([part[name] for part in self._parts]) for name in self._parts[0]}
+        if self.store_dir is not None:
+            return write_market_store(self.columns, csv_path, self.store_dir)
+
+
+def is_fresh(csv_path, store_dir):
+    """True when ``store_dir`` was ingested from the current version of ``csv_path``."""
+    try:
+        with open(os.path.join(store_dir, META_FILE)) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    st = os.stat(csv_path)
+    return meta["source_size"] == st.st_size and meta["source_mtime_ns"] == st.st_mtime_ns
+
+
+def load_columns(store_dir):
+    """Memory-map every column of an ingested market store."""
+    with open(os.path.join(store_dir, META_FILE)) as f:
+        meta = json.load(f)
+    return {
+        name: np.load(os.path.join(store_dir, f"{name}.npy"), mmap_mode='r')
+        for name in meta["columns"]
+    }
+
+
+def open_market_store(csv_path, store_dir):
+    """Memory-mapped columns for ``csv_path``, ingesting it first if needed."""
+    if not is_fresh(csv_path, store_dir):
+        ingest_market_csv(csv_path, store_dir)
+    return load_columns(store_dir)
@@ -0,0 +1,129 @@
+"""Vectorized performance metrics shared by the backend and the Streamlit UIs."""
+import numpy as np
+
+TRADING_DAYS = 252
+INITIAL_CAPITAL = 100000  # 1 lakh, used for percentage returns
+
+
+def equity_curve(pnl):
+    """Cumulative P&L after each trade."""
+    return np.cumsum(np.asarray(pnl, dtype=np.float64))
+
+
+def drawdown_series(equity):
+    """Distance of each equity point below its running peak (<= 0).
+
+    The peak starts at the initial balance of 0, so an opening losing streak
+    counts as drawdown.
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    if equity.size == 0:
+        return equity
+    peak = np.maximum.accumulate(np.maximum(equity, 0.0))
+    return equity - peak
+
+
+def max_drawdown(equity):
+    """Largest peak-to-trough fall of the equity curve (<= 0)."""
+    drawdown = drawdown_series(equity)
+    return float(drawdown.min()) if drawdown.size else 0.0
+
+
+def max_streak(mask):
+    """Length of the longest run of True values."""
+    mask = np.asarray(mask, dtype=bool)
+    if not mask.any():
+        return 0
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return int((ends - starts).max())
+
+
+def max_consecutive_wins(pnl):
+    return max_streak(np.asarray(pnl) > 0)
+
+
+def max_consecutive_losses(pnl):
+    return max_streak(np.asarray(pnl) <= 0)
+
+
+def sharpe_ratio(returns, periods=TRADING_DAYS):
+    """Annualized mean/std of per-period returns (population std)."""
+    returns = np.asarray(returns, dtype=np.float64)
+    if returns.size < 2:
+        return 0.0
+    std = returns.std()
+    return float(returns.mean() / std * np.sqrt(periods)) if std > 0 else 0.0
+
+
+def sortino_ratio(returns, periods=TRADING_DAYS):
+    """Like Sharpe, but only downside deviation counts as risk."""
+    returns = np.asarray(returns, dtype=np.float64)
+    if returns.size < 2:
+        return 0.0
+    downside = np.sqrt(np.mean(np.minimum(returns, 0.0) ** 2))
+    return float(returns.mean() / downside * np.sqrt(periods)) if downside > 0 else 0.0
+
+
+def value_at_risk(returns, level=0.95):
+    """Historical VaR: the (1 - level) percentile of returns."""
+    returns = np.asarray(returns, dtype=np.float64)
+    if returns.size == 0:
+        return 0.0
+    return float(np.percentile(returns, (1 - level) * 100))
+
+
+def profit_factor(pnl):
+    """Gross profit over gross loss; inf when there are no losing trades."""
+    pnl = np.asarray(pnl, dtype=np.float64)
+    gross_loss = pnl[pnl <= 0].sum()
+    if gross_loss == 0:
+        return float('inf')
+    return float(abs(pnl[pnl > 0].sum() / gross_loss))
+
+
+def daily_pnl(dates, pnl):
+    """Sum of P&L per date, as an ordered ``{date: pnl}`` dict."""
+    pnl = np.asarray(pnl, dtype=np.float64)
+    if pnl.size == 0:
+        return {}
+    days, codes = np.unique(np.asarray(dates), return_inverse=True)
+    totals = np.bincount(codes.ravel(), weights=pnl, minlength=len(days))
+    return dict(zip(days.tolist(), totals.tolist()))
+
+
+def summarize_pnl(pnl, gross_pnl=None, brokerage=None, tax=None, daily=None):
+    """The backtest summary dict, computed from per-trade P&L columns."""
+    pnl = np.asarray(pnl, dtype=np.float64)
+    n = int(pnl.size)
+    wins = pnl > 0
+    losses = ~wins
+    equity = equity_curve(pnl)
+    total = float(equity[-1]) if n else 0.0
+
+    def total_of(values):
+        return float(np.sum(values)) if values is not None and n else 0.0
+
+    return {
+        'total_pnl': total,
+        'total_gross_pnl': total_of(gross_pnl),
+        'total_brokerage': total_of(brokerage),
+        'total_tax': total_of(tax),
+        'num_trades': n,
+        'winning_trades': int(wins.sum()),
+        'losing_trades': int(losses.sum()),
+        'win_rate': float(wins.mean()) if n else 0,
+        'avg_win': float(pnl[wins].mean()) if wins.any() else 0,
+        'avg_loss': float(pnl[losses].mean()) if losses.any() else 0,
+        'max_drawdown': max_drawdown(equity),
+        'profit_factor': profit_factor(pnl),
+        'max_consecutive_wins': max_streak(wins),
+        'max_consecutive_losses': max_streak(losses),
+        'sharpe_ratio': sharpe_ratio(pnl),
+        'sortino_ratio': sortino_ratio(pnl),
+        'var_95': value_at_risk(pnl, 0.95),
+        'var_99': value_at_risk(pnl, 0.99),
+        'total_return_pct': total / INITIAL_CAPITAL * 100,
+        'daily_pnl_stats': daily if daily is not None else {},
+    }
@@ -1,5 +1,6 @@
+import math
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 
 class BacktestConfig(BaseModel):
     tradefile: str
@@ -12,8 +13,18 @@ class BacktestConfig(BaseModel):
     reentry_mode: Optional[str] = None  # 'RE-IMMEDIATE' or 'RE-DELAYED'
     reentry_delay: Optional[int] = None # candles to wait if delayed
     expiry_mode: Optional[str] = None   # 'weekly' or 'monthly'
+    strike_kind: Optional[str] = None   # 'ATM', 'ITM' or 'OTM': add an option leg per trade (needs expiry_mode)
+    strike_offset: int = 1              # strikes away from ATM for ITM/OTM
+    underlying: str = 'NIFTY'           # sets the strike step and ticker prefix
     start_time: str = '09:15'
     end_time: str = '15:15'
+
+    # Entry signals: 'indicators' (EMA/RSI below) or 'tradefile' (the uploaded signals)
+    signal_mode: str = 'indicators'
+    use_ema: bool = True
+    ema_window: int = 20
+    use_rsi: bool = True
+    rsi_window: int = 14
     
     # New fields for realistic trading
     position_size: int = 100
@@ -26,4 +37,40 @@ class BacktestConfig(BaseModel):
 class BacktestResult(BaseModel):
     summary: Dict[str, Any]
     trade_log: List[Dict[str, Any]]
-    equity_curve: List[float] 
\ No newline at end of file
+    equity_curve: List[float]
+
+class ColumnarBacktestResult(BaseModel):
+    summary: Dict[str, Any]
+    trade_log: Dict[str, List[Any]]  # field -> one value per trade
+    equity_curve: List[float]
+    position_size: int
+
+class ParamRange(BaseModel):
+    start: float
+    stop: float   # inclusive
+    step: float
+
+    def count(self) -> int:
+        """Number of values, computed without building them."""
+        if self.step <= 0:
+            raise ValueError("step must be positive")
+        steps = (self.stop - self.start) / self.step
+        if not math.isfinite(steps):
+            raise ValueError("start, stop and step must be finite")
+        return max(math.floor(steps + 1e-9) + 1, 0)
+
+    def values(self) -> List[float]:
+        return [round(self.start + i * self.step, 10) for i in range(self.count())]
+
+class SweepConfig(BaseModel):
+    base: BacktestConfig
+    grid: Dict[str, Union[ParamRange, List[Any]]]  # field -> range or explicit values
+    rank_by: str = 'sharpe_ratio'
+    descending: bool = True
+    top_n: Optional[int] = None
+
+class SweepResult(BaseModel):
+    rank_by: str
+    num_combinations: int
+    results: List[Dict[str, Any]]
+
@@ -0,0 +1,133 @@
+import contextlib
+import math
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from engine import MarketArrays, simulate, summarize
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor(max_workers):
+    """Process pool shared by all requests, created on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: forking a threaded uvicorn worker is not safe
+            _executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def shutdown_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(cancel_futures=True)
+            _executor = None
+
+
+class SharedMarket:
+    """Signal-ready market arrays published in shared memory.
+
+    Every part of the arrays is published, including the day, end-of-day and
+    extrema indexes, so workers attach to the blocks by name instead of
+    rebuilding them and only the small ``spec`` tuple is pickled per task.
+    Use as a context manager; the blocks are unlinked on exit.
+    """
+
+    def __init__(self, arrays, long_signals, short_signals):
+        columns = {
+            **arrays.parts(),
+            'long_signals': long_signals,
+            'short_signals': short_signals,
+        }
+        self._blocks = []
+        layout = {}
+        try:
+            for name, values in columns.items():
+                values = np.ascontiguousarray(values)
+                shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+                self._blocks.append(shm)
+                np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[...] = values
+                layout[name] = (shm.name, values.shape, values.dtype.str)
+        except Exception:
+            self.close()
+            raise
+        self.spec = (layout, arrays.end_time)
+
+    def close(self):
+        for shm in self._blocks:
+            shm.close()
+            shm.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def simulate_configs(arrays, long_signals, short_signals, configs, full=False):
+    """Simulate ``configs`` one after another against one market.
+
+    Returns summaries, or ``(summary, trade_log, equity_curve)`` tuples when
+    ``full`` is set.
+    """
+    results = []
+    for config in configs:
+        trade_log, equity_curve = simulate(config, arrays, long_signals, short_signals)
+        summary = summarize(trade_log, arrays)
+        results.append((summary, trade_log, equity_curve) if full else summary)
+    return results
+
+
+def _run_chunk(spec, configs, full):
+    """Worker entry point: simulate ``configs`` against a shared market."""
+    layout, end_time = spec
+    blocks = []
+    columns = {}
+    for name, (shm_name, shape, dtype) in layout.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        blocks.append(shm)
+        columns[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+    try:
+        arrays = MarketArrays.from_parts(columns, end_time)
+        return simulate_configs(arrays, columns['long_signals'], columns['short_signals'], configs, full)
+    finally:
+        # Views must be released before the mappings can be closed
+        arrays = columns = None
+        for shm in blocks:
+            shm.close()
+
+
+def run_groups(groups, workers, full=False):
+    """Simulate ``(arrays, long_signals, short_signals, configs)`` groups on the pool.
+
+    Every group's chunks are submitted before any result is awaited, so
+    groups on different markets or signals run side by side; their shared
+    blocks stay open until all of them are done. Returns one list of results
+    per group, in input order (see ``simulate_configs``).
+    """
+    executor = get_executor(workers)
+    total = sum(len(configs) for *_, configs in groups)
+    chunk_size = max(1, math.ceil(total / (workers * 4)))
+
+    with contextlib.ExitStack() as stack:
+        pending = []
+        for arrays, long_signals, short_signals, configs in groups:
+            shared = stack.enter_context(SharedMarket(arrays, long_signals, short_signals))
+            pending.append([
+                executor.submit(_run_chunk, shared.spec, configs[i:i + chunk_size], full)
+                for i in range(0, len(configs), chunk_size)
+            ])
+        return [[result for future in futures for result in future.result()] for futures in pending]
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+# Strike interval of each underlying's option chain
+STRIKE_STEPS = {
+    'NIFTY': 50,
+    'BANKNIFTY': 100,
+    'FINNIFTY': 50,
+    'MIDCPNIFTY': 25,
+    'SENSEX': 100,
+}
+STRIKE_KINDS = ('ATM', 'ITM', 'OTM')
+
+
+def strike_step(underlying):
+    try:
+        return STRIKE_STEPS[underlying.upper()]
+    except KeyError:
+        raise ValueError(f"Unknown underlying {underlying!r}; expected one of {sorted(STRIKE_STEPS)}")
+
+
+def select_strikes(spot, kind, offset, option_type, step):
+    """ATM/ITM/OTM strikes for every spot price at once.
+
+    ATM is the spot rounded to the nearest ``step``. OTM moves ``offset``
+    steps away from the money (up for calls, down for puts) and ITM the
+    other way. ``option_type`` is 'CE'/'PE', scalar or per spot.
+    """
+    if kind not in STRIKE_KINDS:
+        raise ValueError(f"strike_kind must be one of {list(STRIKE_KINDS)}")
+    atm = np.rint(np.asarray(spot, dtype=np.float64) / step).astype(np.int64) * step
+    if kind == 'ATM':
+        return atm
+    away = np.where(np.asarray(option_type) == 'CE', 1, -1) * (offset * step)
+    return atm + away if kind == 'OTM' else atm - away
+
+
+def option_tickers(underlying, expiries, strikes, option_types):
+    """Option-chain ticker keys such as ``NIFTY02JAN2524000CE.NFO``.
+
+    ``expiries`` are 'YYYY-MM-DD' strings; trades without one get None.
+    Each distinct expiry is formatted only once.
+    """
+    expiries = np.asarray(expiries, dtype=object)
+    dated = pd.notna(expiries)
+    tickers = np.full(len(expiries), None, dtype=object)
+    if dated.any():
+        days, codes = np.unique(expiries[dated].astype(str), return_inverse=True)
+        labels = pd.to_datetime(days).strftime('%d%b%y').str.upper().to_numpy(dtype=object)
+        strikes = np.asarray(strikes)[dated].astype(str).astype(object)
+        option_types = np.broadcast_to(np.asarray(option_types), expiries.shape)[dated].astype(object)
+        tickers[dated] = underlying.upper() + labels[codes] + strikes + option_types + '.NFO'
+    return tickers
+
+
+class OptionLeg:
+    """The option bought with each trade: a call for longs, a put for shorts."""
+
+    def __init__(self, kind='ATM', offset=1, underlying='NIFTY'):
+        if kind not in STRIKE_KINDS:
+            raise ValueError(f"strike_kind must be one of {list(STRIKE_KINDS)}")
+        self.kind = kind
+        self.offset = int(offset)
+        self.underlying = underlying.upper()
+        self.step = strike_step(underlying)
+
+    @classmethod
+    def from_config(cls, config):
+        """The leg configured by ``strike_kind``, or None when it is unset."""
+        kind = getattr(config, 'strike_kind', None)
+        if not kind:
+            return None
+        return cls(kind, getattr(config, 'strike_offset', 1), getattr(config, 'underlying', 'NIFTY'))
+
+    def resolve(self, spot, direction, expiries):
+        """``strike``, ``option_type`` and ``ticker`` columns for trades entered at ``spot``."""
+        option_types = np.where(np.asarray(direction) > 0, 'CE', 'PE')
+        strikes = select_strikes(spot, self.kind, self.offset, option_types, self.step)
+        return {
+            'strike': strikes,
+            'option_type': option_types,
+            'ticker': option_tickers(self.underlying, expiries, strikes, option_types),
+        }
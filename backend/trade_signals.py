@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+from engine import minute_of_day, session_mask
+from market_store import map_unique, parse_dates
+
+MINUTES_PER_DAY = 24 * 60
+
+# Signal column values -> +1 (long) / -1 (short)
+SIGNAL_DIRECTIONS = {'LONG': 1, 'BUY': 1, 'SHORT': -1, 'SELL': -1}
+
+
+def _minutes(values):
+    """Minute of day of 'HH:MM' / 'HH:MM:SS' strings or ``datetime.time`` values.
+
+    Raises ValueError for a blank or malformed time, naming the file line of
+    the first blank one.
+    """
+    missing = values.isna().to_numpy() | (values.astype(str).str.strip() == '').to_numpy()
+    if missing.any():
+        raise ValueError(f"Missing time on line {values.index[missing][0] + 2}")
+
+    def minutes(uniques):
+        return np.array([minute_of_day(value) for value in uniques], dtype=np.int64)
+    return pd.Series(map_unique(values, minutes), index=values.index)
+
+
+def _epoch_minutes(dates, times=None):
+    """Minutes since 1970-01-01 from a date column and an optional time column."""
+    dates = pd.Series(parse_dates(dates), index=dates.index)
+    if times is None:
+        dates = dates.dt.floor('min')
+        minutes = dates.dt.hour * 60 + dates.dt.minute
+    else:
+        minutes = _minutes(times)
+    days = dates.dt.normalize().to_numpy().astype('datetime64[D]').astype(np.int64)
+    return days * MINUTES_PER_DAY + minutes.to_numpy(dtype=np.int64)
+
+
+def read_signal_file(path):
+    """Entry signals of an uploaded trade file, sorted by time.
+
+    Two layouts are understood: signal lists with ``Date``, ``Time`` and
+    ``Signal`` (LONG/SHORT or BUY/SELL) columns, like ``sample_trades.csv``,
+    and strategy-tester exports whose ``Type`` column holds 'Entry long' /
+    'Exit short' rows, of which only the entries are used. Returns a frame
+    with ``Timestamp`` (minutes since the epoch) and ``Direction`` (+1/-1).
+    """
+    raw = pd.read_excel(path) if path.lower().endswith(('.xlsx', '.xls')) else pd.read_csv(path)
+    raw.columns = [str(c).strip() for c in raw.columns]
+
+    if 'Signal' in raw.columns:
+        directions = raw['Signal'].astype(str).str.strip().str.upper().map(SIGNAL_DIRECTIONS)
+        date_col, time_col = 'Date', 'Time'
+    elif 'Type' in raw.columns:
+        kind = raw['Type'].astype(str).str.strip().str.lower().str.split()
+        raw = raw[kind.str[0] == 'entry']
+        directions = kind[raw.index].str[-1].str.upper().map(SIGNAL_DIRECTIONS)
+        date_col = 'Date/Time'
+        time_col = next((c for c in raw.columns if c.lower() == 'time'), None)
+    else:
+        raise ValueError("Trade file needs a 'Signal' or 'Type' column")
+
+    raw = raw[directions.notna()]
+    timestamps = _epoch_minutes(raw[date_col], raw[time_col] if time_col else None)
+    signals = pd.DataFrame({
+        'Timestamp': timestamps,
+        'Direction': directions[raw.index].to_numpy(dtype=np.int8),
+    })
+    return signals.sort_values('Timestamp', kind='stable').reset_index(drop=True)
+
+
+def bar_timestamps(arrays):
+    """Minutes since the epoch of every market bar."""
+    return arrays.day_id.astype(np.int64) * MINUTES_PER_DAY + arrays.minute
+
+
+def align_signals(arrays, config, timestamps, directions):
+    """Long/short entry masks from external signals via an as-of join.
+
+    Each signal enters on the latest bar at or before its timestamp on the
+    same day; signals before the day's first bar or outside the session
+    window are dropped.
+    """
+    bars = bar_timestamps(arrays)
+    if np.any(bars[1:] < bars[:-1]):
+        raise ValueError("Market data must be in time order")
+
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    directions = np.asarray(directions)
+    pos = np.searchsorted(bars, timestamps, side='right') - 1
+    matched = pos >= 0
+    pos = np.maximum(pos, 0)
+    matched &= bars[pos] // MINUTES_PER_DAY == timestamps // MINUTES_PER_DAY
+
+    in_session = session_mask(arrays, config)
+    long_signals = np.zeros(len(arrays), dtype=bool)
+    short_signals = np.zeros(len(arrays), dtype=bool)
+    long_signals[pos[matched & (directions > 0)]] = True
+    short_signals[pos[matched & (directions < 0)]] = True
+    return long_signals & in_session, short_signals & in_session
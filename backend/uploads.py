@@ -0,0 +1,273 @@
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import uuid
+
+import pandas as pd
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Room for the multipart boundaries and part headers around an upload's bytes
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# Largest header line read before giving up on a CSV
+MAX_HEADER_BYTES = 64 * 1024
+
+# Leading bytes of the Excel formats the trade reader accepts
+EXCEL_MAGIC = {
+    '.xlsx': b'PK\x03\x04',
+    '.xls': b'\xd0\xcf\x11\xe0',
+}
+
+
+SHA256_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload grows past its size limit."""
+
+
+class MultipartFile:
+    """Incremental parser for one file field of a ``multipart/form-data`` body.
+
+    ``feed`` takes raw body chunks as they arrive and returns the bytes of
+    the file found in them; ``filename`` is set as soon as the file's part
+    headers have been read, before any of its bytes. Other fields are
+    skipped. Malformed bodies raise ValueError.
+    """
+
+    def __init__(self, content_type, field="file"):
+        kind, options = parse_options_header(content_type)
+        if kind != b"multipart/form-data" or not options.get(b"boundary"):
+            raise ValueError("Expected a multipart/form-data upload")
+        self.field = field
+        self.filename = None
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._in_file = False
+        self._file_done = False
+        self._ended = False
+        self._pieces = []
+        self._parser = MultipartParser(options[b"boundary"], callbacks={
+            "on_part_begin": self._on_part_begin,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_end": self._on_end,
+        })
+
+    def feed(self, chunk):
+        self._parser.write(chunk)
+        data, self._pieces = b"".join(self._pieces), []
+        return data
+
+    def finish(self):
+        """Raise ValueError unless the body was complete and had the file."""
+        if self.filename is None:
+            raise ValueError(f"Missing file field {self.field!r}")
+        if not self._ended:
+            raise ValueError("Upload ended before the multipart body was complete")
+
+    def _on_part_begin(self):
+        self._disposition = b""
+
+    def _on_header_field(self, data, start, end):
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data, start, end):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        self._in_file = (
+            not self._file_done
+            and options.get(b"name") == self.field.encode()
+            and b"filename" in options
+        )
+        if self._in_file:
+            self.filename = options[b"filename"].decode("utf-8", "replace")
+
+    def _on_part_data(self, data, start, end):
+        if self._in_file:
+            self._pieces.append(data[start:end])
+
+    def _on_part_end(self):
+        if self._in_file:
+            self._in_file = False
+            self._file_done = True
+
+    def _on_end(self):
+        self._ended = True
+
+
+class CsvHeaderCheck:
+    """Validates a CSV's header row as soon as it has been received.
+
+    ``check`` is called once with the list of column names and raises
+    ValueError to reject the file.
+    """
+
+    def __init__(self, check):
+        self.check = check
+        self._head = b""
+        self._done = False
+
+    def feed(self, chunk):
+        if self._done:
+            return
+        self._head += chunk
+        if b"\n" in self._head:
+            self._validate(self._head[:self._head.index(b"\n") + 1])
+        elif len(self._head) > MAX_HEADER_BYTES:
+            raise ValueError("CSV header line is too long")
+
+    def _validate(self, line):
+        self._done = True
+        try:
+            columns = pd.read_csv(io.BytesIO(line), nrows=0).columns
+        except (ValueError, UnicodeDecodeError) as e:
+            raise ValueError(f"Unreadable CSV header: {e}")
+        self.check([str(c).strip() for c in columns])
+
+    def finish(self, path):
+        if not self._done:
+            if not self._head.strip():
+                raise ValueError("File is empty")
+            self._validate(self._head)
+
+
+class MagicCheck:
+    """Validates the leading bytes of a binary upload."""
+
+    def __init__(self, magic, kind):
+        self.magic = magic
+        self.kind = kind
+        self._head = b""
+
+    def feed(self, chunk):
+        if len(self._head) < len(self.magic):
+            self._head += chunk[:len(self.magic)]
+            if len(self._head) >= len(self.magic):
+                self._check()
+
+    def _check(self):
+        if not self._head.startswith(self.magic):
+            raise ValueError(f"File is not a valid {self.kind} file")
+
+    def finish(self, path):
+        self._check()
+
+
+def check_trade_header(columns):
+    """Raise ValueError unless a trade CSV has the columns read_signal_file needs."""
+    if 'Signal' not in columns and 'Type' not in columns:
+        raise ValueError("Trade file needs a 'Signal' or 'Type' column")
+
+
+def upload_name(filename, extensions):
+    """The bare file name of an upload, rejecting paths and unsupported extensions."""
+    name = os.path.basename((filename or '').replace('\\', '/'))
+    if not name or name in ('.', '..'):
+        raise ValueError("Missing file name")
+    if not name.lower().endswith(extensions):
+        raise ValueError(f"Unsupported file type; expected one of {', '.join(extensions)}")
+    return name
+
+
+def blob_name(digest, extension):
+    """File name of uploaded content, e.g. ``<sha256>.csv``."""
+    return digest + extension.lower()
+
+
+def is_digest(value):
+    return bool(SHA256_PATTERN.fullmatch(value or ''))
+
+
+class AliasTable:
+    """Persistent map from uploaded file names to the content they refer to.
+
+    Values are content file names from ``blob_name``. The table is a JSON
+    file rewritten atomically on every change, so aliases survive restarts.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path) as f:
+                self._aliases = json.load(f)
+        except (OSError, ValueError):
+            self._aliases = {}
+
+    def get(self, name):
+        with self._lock:
+            return self._aliases.get(name)
+
+    def set(self, name, blob):
+        with self._lock:
+            self._aliases[name] = blob
+            tmp_path = f"{self.path}.{uuid.uuid4().hex}.part"
+            with open(tmp_path, "w") as f:
+                json.dump(self._aliases, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+
+class StreamedUpload:
+    """Writes an upload to disk chunk by chunk while hashing and validating it.
+
+    Chunks go to a temporary file in ``directory`` and through every sink's
+    ``feed``. Once the upload is complete its ``digest`` is known, and
+    ``commit`` moves it to its final path after every sink's ``finish``
+    accepts it. Sinks raise ValueError to reject the upload.
+    """
+
+    def __init__(self, directory, max_bytes, sinks=()):
+        self.max_bytes = max_bytes
+        self.sinks = list(sinks)
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._tmp_path = os.path.join(directory, f"{uuid.uuid4().hex}.part")
+        self._file = open(self._tmp_path, "wb")
+
+    @property
+    def digest(self):
+        """SHA-256 of the bytes written so far."""
+        return self._hash.hexdigest()
+
+    def write(self, chunk):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadTooLarge(f"File exceeds the {self.max_bytes // (1024 * 1024)} MB upload limit")
+        self._file.write(chunk)
+        self._hash.update(chunk)
+        for sink in self.sinks:
+            sink.feed(chunk)
+
+    def commit(self, path):
+        """Finish the sinks and move the completed file to ``path``."""
+        self._file.close()
+        for sink in self.sinks:
+            sink.finish(self._tmp_path)
+        # A rename keeps the mtime, so stores built from the temporary
+        # file stay fresh for ``path``
+        os.replace(self._tmp_path, path)
+
+    def abort(self):
+        self._file.close()
+        try:
+            os.remove(self._tmp_path)
+        except OSError:
+            pass
@@ -1,10 +1,18 @@
+import numpy as np
 import pandas as pd
 import re
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from datetime import datetime
 import os
 import warnings
 warnings.filterwarnings('ignore')
 
+# Memory budget for parsed daily option-chain files kept between trades
+DAILY_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+# Symbol, Expiry, Strike, OptionType of tickers like NIFTY02APR208300CE.NFO
+OPTION_SYMBOL_PATTERN = r'^([A-Z]+)(\d{2}[A-Z]{3}\d{2})(\d+(?:\.\d+)?)(CE|PE)\.NFO$'
+
 def str_to_date(nse_date: str) -> str:
     """Convert '25JAN24' to '2024-01-25'."""
     return datetime.strptime(nse_date, "%d%b%y").strftime("%Y-%m-%d")
@@ -21,11 +29,8 @@ def date_to_str(date_str: str) -> str:
 
 from datetime import datetime
 
-def format_to_dd_mm_yyyy(date_string):
-
-    
-    # List of common date formats to try
-    date_formats = [
+# List of common date formats to try
+DATE_FORMATS = [
         "%Y-%m-%d",      # 2020-04-07
         "%d-%m-%Y",      # 07-04-2020
         "%m-%d-%Y",      # 04-07-2020
@@ -40,27 +45,82 @@ def format_to_dd_mm_yyyy(date_string):
         "%d %B %Y",      # 07 April 2020
         "%Y-%m-%d %H:%M:%S",  # 2020-04-07 10:30:00
         "%d-%m-%Y %H:%M:%S",  # 07-04-2020 10:30:00
-    ]
-    
+]
+
+def parse_date(date_string):
     # Try each format
-    for fmt in date_formats:
+    for fmt in DATE_FORMATS:
         try:
-            parsed_date = datetime.strptime(date_string, fmt)
-            return parsed_date.strftime("%d-%m-%Y")
+            return datetime.strptime(date_string, fmt)
         except ValueError:
             continue
     
     # If no format worked, raise an error
     raise ValueError(f"Unable to parse date string: '{date_string}'. Please use a recognized date format.")
 
+def format_to_dd_mm_yyyy(date_string):
+    return parse_date(date_string).strftime("%d-%m-%Y")
+
+def detect_date_format(sample):
+    """First of DATE_FORMATS that parses every string in sample, or None."""
+    for fmt in DATE_FORMATS:
+        try:
+            for value in sample:
+                datetime.strptime(value, fmt)
+            return fmt
+        except ValueError:
+            continue
+    return None
+
+def parse_dates(values, sample_size=20):
+    """datetime64 Series for a column of dates in any of DATE_FORMATS.
+
+    The format is detected once from a sample of the distinct values and each
+    distinct value is parsed once with it; values it does not fit fall back to
+    parse_date. Missing values become NaT.
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    codes, uniques = pd.factorize(values.astype('string'))
+    uniques = list(uniques)
+    fmt = detect_date_format(uniques[:sample_size])
+    parsed = pd.Series(pd.to_datetime(uniques, format=fmt, errors='coerce') if fmt else pd.NaT, index=range(len(uniques)),
+                       dtype='datetime64[ns]')
+    for i in np.flatnonzero(parsed.isna()):
+        parsed[i] = parse_date(uniques[i])
+    # Missing values have code -1, which picks the trailing NaT
+    lookup = np.append(parsed.to_numpy(), np.datetime64('NaT'))
+    return pd.Series(lookup[codes], index=values.index)
+
+def day_ids(dates):
+    """int32 days since 1970-01-01 of a datetime Series (-1 where missing)."""
+    days = pd.Series(dates).to_numpy(dtype='datetime64[D]')
+    return np.where(np.isnat(days), -1, days.astype(np.int64)).astype(np.int32)
+
+def time_to_seconds(times):
+    """int32 seconds since midnight of 'HH:MM:SS' strings, converting each distinct time once (-1 where missing)."""
+    codes, uniques = pd.factorize(pd.Series(times).astype('string'))
+    seconds = np.full(len(uniques) + 1, -1, dtype=np.int32)
+    if len(uniques):
+        parts = pd.Series(uniques, dtype='string').str.split(':', expand=True).astype(int)
+        seconds[:-1] = parts[0] * 3600 + parts[1] * 60 + parts[2]
+    return seconds[codes]
+
+def format_dates(dates, fmt):
+    """strftime of a datetime Series, formatting each distinct date once."""
+    codes, uniques = pd.factorize(dates)
+    labels = np.append(pd.DatetimeIndex(uniques).strftime(fmt).to_numpy(dtype=object), np.nan)
+    return pd.Series(list(labels[codes]), index=dates.index)
+
 def read_tradeFile(file_path):
     #df = pd.read_csv(file_path)
     df = pd.read_excel(file_path, sheet_name='Sheet1', header=0)
     df['Type'] = df['Type'].astype('string')
-    df['Date/Time'] = df['Date/Time'].astype('string')
-    df['Date/Time'] = df['Date/Time'].apply(format_to_dd_mm_yyyy)
+    dates = parse_dates(df['Date/Time'])
+    df['Date/Time'] = format_dates(dates, '%d-%m-%Y')
     df['time'] = df['time'].astype('string')
-    df['StringDate'] = df['Date/Time'].apply(date_to_str)
+    df['StringDate'] = format_dates(dates, '%d%b%y').str.upper()
     df['StringDate'] = df['StringDate'].astype('string')
     df['Price INR'] = df['Price INR'].str.replace(',', '').astype(float)
     df['Rounded Price'] = df['Price INR'].apply(lambda x: round(x, -2)).astype(int)
@@ -74,9 +134,12 @@ def read_tradeFile(file_path):
 def read_database(file_path):
     df = pd.read_csv(file_path)
     df['Ticker'] = df['Ticker'].astype('string')
-    df['Date'] = df['Date'].astype('string')
-    df['Date'] = df['Date'].apply(format_to_dd_mm_yyyy)
+    dates = parse_dates(df['Date'])
+    df['Date'] = format_dates(dates, '%d-%m-%Y')
     df['Time'] = df['Time'].astype('string')
+    # Integer keys for lookups: days since 1970-01-01 and seconds since midnight
+    df['DayId'] = day_ids(dates)
+    df['Second'] = time_to_seconds(df['Time'])
     df = split_column(df, 'Ticker')
     #print(df.dtypes)
     #print(df.head(10))
@@ -84,19 +147,63 @@ def read_database(file_path):
     #print(df.dtypes)
     
 
+def index_option_chain(df):
+    """Index a daily option-chain frame on (Ticker, DayId, Second), keeping the first row of each key."""
+    df = df.set_index(['Ticker', 'DayId', 'Second'])
+    return df[~df.index.duplicated(keep='first')]
+
+def read_indexed_database(file_path):
+    return index_option_chain(read_database(file_path))
+
+class DailyFileCache:
+    """LRU cache of parsed daily option-chain files, keyed by path and bounded by memory."""
+
+    def __init__(self, max_bytes=DAILY_CACHE_MAX_BYTES, loader=None):
+        self.max_bytes = max_bytes
+        self.loader = loader or read_indexed_database
+        self._frames = OrderedDict()  # path -> (df, nbytes)
+        self._bytes = 0
+
+    def get(self, path):
+        if path in self._frames:
+            self._frames.move_to_end(path)
+            return self._frames[path][0]
+
+        df = self.loader(path)
+        nbytes = int(df.memory_usage(deep=True).sum())
+        if nbytes <= self.max_bytes:
+            self._frames[path] = (df, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._frames.popitem(last=False)
+                self._bytes -= evicted
+        return df
+
 def split_option_symbol(symbol_str):
-    # Define the regex pattern
-    pattern = r'^([A-Z]+)(\d{2}[A-Z]{3}\d{2})(\d+(?:\.\d+)?)(CE|PE)\.NFO$'
-    
-    match = re.match(pattern, symbol_str)
+    match = re.match(OPTION_SYMBOL_PATTERN, symbol_str)
     if match:
         return match.groups()  # Returns a tuple (Symbol, Expiry, Strike, OptionType)
     else:
         return (None, None, None, None)
 
-# Example usage with a DataFrame
+def parse_option_symbols(tickers):
+    """Symbol, Expiry (datetime), Strike (float) and OptionType columns for a ticker Series.
+
+    Each distinct ticker is parsed once and mapped back to the rows through
+    its factorized code; tickers that do not match come back as NaN.
+    """
+    codes, uniques = pd.factorize(tickers)
+    parts = pd.Series(uniques, dtype='string').str.extract(OPTION_SYMBOL_PATTERN)
+    parts.columns = ['Symbol', 'Expiry', 'Strike', 'OptionType']
+    parts['Symbol'] = parts['Symbol'].astype('category')
+    parts['Expiry'] = pd.to_datetime(parts['Expiry'], format='%d%b%y', errors='coerce')
+    parts['Strike'] = parts['Strike'].astype('float64')
+    parts['OptionType'] = parts['OptionType'].astype('category')
+    # Code -1 (missing ticker) is not a row label, so it reindexes to NaN
+    return parts.reindex(codes).set_axis(tickers.index)
+
 def split_column(df, column_name):
-    df[['Symbol', 'Expiry', 'Strike', 'OptionType']] = df[column_name].apply(lambda x: pd.Series(split_option_symbol(x)))
+    df[['Symbol', 'Expiry', 'Strike', 'OptionType']] = parse_option_symbols(df[column_name])
     return df
 
 def get_filtered_sorted_dates(df, symbol, strike, option_type, date_column='Expiry'):
@@ -105,21 +212,17 @@ def get_filtered_sorted_dates(df, symbol, strike, option_type, date_column='Expi
     # Apply filters based on the three input parameters
     filtered_df = df[
         (df['Symbol'] == symbol) & 
-        (df['Strike'] == strike) & 
+        (df['Strike'] == float(strike)) & 
         (df['OptionType'] == option_type)
     ]
-    filtered_df.to_csv('filtered_data.csv', index=False)  # Save filtered data for debugging
     
     # If no data matches the filters, return empty list
     if filtered_df.empty:
         return []
     
-    # Convert date strings to datetime for proper sorting
-    # Format: %d%b%y (e.g., 02JAN25 = 02-Jan-2025)
-    date_series = pd.to_datetime(filtered_df[date_column], format='%d%b%y')
-    
-    # Get unique dates, sort them, and convert back to original string format
-    unique_sorted_dates = date_series.drop_duplicates().sort_values()
+    # Get unique expiry dates, sort them, and convert back to the ticker format
+    # (e.g., 02-Jan-2025 = 02JAN25)
+    unique_sorted_dates = filtered_df[date_column].dropna().drop_duplicates().sort_values()
     
     # Convert back to original string format
     date_strings = unique_sorted_dates.dt.strftime('%d%b%y').str.upper()
@@ -203,88 +306,119 @@ def validate_single_trade(df, trade_number, trade_col='Trade #'):
         'message': f'Trade {trade_number}: Valid ({trade_types[0]})'
     }
 
+def validate_trades(df, trade_col='Trade #'):
+    """validate_single_trade for every trade at once, from a single groupby.
+
+    Returns a table indexed by trade number with entry_count, exit_count,
+    valid, message and the entry_row / exit_row index labels of each trade,
+    so callers can reach both legs without filtering the frame again.
+    """
+    trades = df[trade_col]
+    is_entry = df['Action'] == 'Entry'
+    is_exit = df['Action'] == 'Exit'
+    table = pd.DataFrame({
+        'entry_count': is_entry.groupby(trades).sum(),
+        'exit_count': is_exit.groupby(trades).sum(),
+        'trade_types': df.groupby(trade_col)['Trade_Type'].unique(),
+    })
+    
+    # First entry and exit row of every trade
+    table['entry_row'] = pd.Series(df.index[is_entry], index=trades[is_entry]).groupby(level=0).first().reindex(table.index).astype('Int64')
+    table['exit_row'] = pd.Series(df.index[is_exit], index=trades[is_exit]).groupby(level=0).first().reindex(table.index).astype('Int64')
+    
+    counts_ok = (table['entry_count'] == 1) & (table['exit_count'] == 1)
+    types_ok = table['trade_types'].map(len) == 1
+    table['valid'] = counts_ok & types_ok
+    table['message'] = [
+        f'Trade {n}: Valid ({types[0]})' if valid else
+        f'Trade {n}: Found {entries} entries and {exits} exits (expected 1 each)' if not counts else
+        f'Trade {n}: Mismatched trade types: {list(types)}'
+        for n, entries, exits, types, counts, valid in zip(
+            table.index, table['entry_count'], table['exit_count'], table['trade_types'], counts_ok, table['valid'])
+    ]
+    return table
+
+def option_chain_path(base_path, trade_date):
+    """Path of the GFDL option-chain file for a 'dd-mm-yyyy' trade date."""
+    parsed_date = datetime.strptime(trade_date, "%d-%m-%Y")
+    file_name = f'{parsed_date.strftime("%Y")}/{parsed_date.strftime("%b_%Y").upper()}/GFDLNFO_OPTIONS_{parsed_date.strftime("%d%m%Y")}.csv'
+    return os.path.join(base_path, *file_name.split('/'))
+
+def fill_leg_prices(trade_db_df, row_number, database_df, day_id, second, expiry_dates, strike_price, option_type, price_column):
+    """Write the option price of every expiry/strike combination onto one trade row.
+
+    ``database_df`` is indexed on (Ticker, DayId, Second), so all prices at
+    ``day_id``/``second`` come from a single reindex; combinations missing
+    from the file are left empty.
+    """
+    colnames = []
+    keys = []
+    for j, expiry in enumerate(expiry_dates[:4], start=1):
+        for k in range(-1500, 1600, 100):
+            colnames.append(f"Expiry{j} - ATM {k}")
+            keys.append((f"NIFTY{expiry}{strike_price+k}{option_type}.NFO", day_id, second))
+    if keys:
+        prices = database_df[price_column].reindex(pd.MultiIndex.from_tuples(keys))
+        trade_db_df.loc[row_number, colnames] = prices.to_numpy()
+
 def main():
     trade_db_df = read_tradeFile(r'E:\trades 1.xlsx')
     base_path = r'E:\Database'
     print(trade_db_df.head(10))
+    daily_files = DailyFileCache()
 
-    number_of_trades = trade_db_df['Trade #'].max()
-    #number_of_trades + 1
-    for i in range(1, number_of_trades + 1):
-        try:
-            trade_check = validate_single_trade(trade_db_df, i)
-
-            if trade_check['valid']:
-                # GET THE ROW NUMBER ON WHICH THE TRADE IS ENTERED
-                row_number = trade_db_df[(trade_db_df['Trade #'] == i) & (trade_db_df['Action'] == 'Entry')].index[0]
-
-                # COMPLETING THE ENTRY TRADE DETAILS
-                # CREATING THE FILE NAME BASED ON THE TRADE DATE
-                trade_type = trade_db_df.loc[row_number, 'Trade_Type']
-                trade_date = trade_db_df.loc[row_number, 'Date/Time']
-                trade_time = (datetime.strptime(trade_db_df.loc[row_number, 'time'], "%H:%M:%S") - timedelta(seconds=1)).strftime("%H:%M:%S")
-                option_type = 'CE' if trade_type == 'short' else 'PE'
-                strike_price = trade_db_df.loc[row_number, 'Rounded Price']
-                parsed_date = datetime.strptime(trade_date, "%d-%m-%Y")
-                file_name = f'{parsed_date.strftime("%Y")}/{parsed_date.strftime("%b_%Y").upper()}/GFDLNFO_OPTIONS_{parsed_date.strftime("%d%m%Y")}.csv'            
-                path = os.path.join(base_path, *file_name.split('/'))
-                #print(f"{path}")
-                database_df = read_database(path)
-
-                #dates = get_filtered_sorted_dates(database_df, 'NIFTY', str(strike_price), option_type)
-                dates = database_df['Expiry'].unique().tolist()
-                date_series = pd.to_datetime(dates, format='%d%b%y')
-                sorted_dates = date_series.sort_values()
-                sorted_date_list = sorted_dates.strftime('%d%b%y').tolist()
+    # Integer day and price time of every row; prices are read one second
+    # before the trade time
+    trade_dates = pd.to_datetime(trade_db_df['Date/Time'], format='%d-%m-%Y')
+    trade_day_ids = day_ids(trade_dates)
+    price_seconds = (time_to_seconds(trade_db_df['time']) - 1) % 86400
 
-                trade_db_df.loc[row_number, 'ExpiryDates'] = ', '.join(sorted_date_list)
-                print(sorted_date_list)
-                expiry_dates = get_closest_dates(dates, trade_db_df.loc[row_number, 'StringDate'], top_n=4)
-                trade_db_df.loc[row_number, 'ExpiryDates1'] = ', '.join(expiry_dates)
-                print(expiry_dates)
+    # Group the entry and exit legs of every valid trade by trading day, so
+    # each daily option-chain file is parsed once per run
+    legs_by_date = {}
+    validation = validate_trades(trade_db_df)
+    for i, trade in validation[validation['valid']].iterrows():
+        for order, row_number in enumerate((trade['entry_row'], trade['exit_row'])):
+            trade_date = trade_dates[row_number]
+            legs_by_date.setdefault(trade_date, []).append((order, i, row_number))
+
+    # Expiries and strike picked at entry, reused for the exit leg
+    entries = {}
+    for trade_date in sorted(legs_by_date):
+        path = option_chain_path(base_path, trade_date.strftime("%d-%m-%Y"))
+        print(f"{path}")
+        # Entries before exits, so same-day exits find their entry
+        for order, i, row_number in sorted(legs_by_date[trade_date]):
+            try:
+                database_df = daily_files.get(path)
+                if order == 0:
+                    # COMPLETING THE ENTRY TRADE DETAILS
+                    trade_type = trade_db_df.loc[row_number, 'Trade_Type']
+                    option_type = 'CE' if trade_type == 'short' else 'PE'
+                    strike_price = trade_db_df.loc[row_number, 'Rounded Price']
 
-                for j in range(1, 5):
-                    for k in range(-1500, 1600, 100):
-                        colname = f"Expiry{j} - ATM {k}"
-                        result = database_df[
-                        (database_df['Ticker'] == f"NIFTY{expiry_dates[j-1]}{strike_price+k}{option_type}.NFO") & 
-                        (database_df['Date'] == trade_date) & 
-                        (database_df['Time'] == trade_time)]['Low']
-                        if len(result) > 0 & len(result) < 2:
-                            trade_db_df.loc[row_number, colname] = result.iloc[0]
-                        else:
-                            #trade_db_df.loc[row_number, colname] = f"NIFTY{expiry_dates[j-1]}{strike_price+i}{option_type}.NFO  {trade_date}-{trade_time}"
-                            trade_db_df.loc[row_number, colname] = None
-
-                row_number = trade_db_df[(trade_db_df['Trade #'] == i) & (trade_db_df['Action'] == 'Exit')].index[0]
-                trade_date = trade_db_df.loc[row_number, 'Date/Time']
-                trade_time = (datetime.strptime(trade_db_df.loc[row_number, 'time'], "%H:%M:%S") - timedelta(seconds=1)).strftime("%H:%M:%S")
-                parsed_date = datetime.strptime(trade_date, "%d-%m-%Y")
-                file_name = f'{parsed_date.strftime("%Y")}/{parsed_date.strftime("%b_%Y").upper()}/GFDLNFO_OPTIONS_{parsed_date.strftime("%d%m%Y")}.csv'
-                path = os.path.join(base_path, *file_name.split('/'))
-                print(f"{path}")
-                database_df = read_database(path)
+                    date_series = pd.DatetimeIndex(database_df['Expiry'].dropna().unique()).sort_values()
+                    sorted_date_list = date_series.strftime('%d%b%y').tolist()
+                    dates = date_series.strftime('%d%b%y').str.upper().tolist()
+                    expiry_dates = get_closest_dates(dates, trade_db_df.loc[row_number, 'StringDate'], top_n=4)
+                    entries[i] = (sorted_date_list, expiry_dates, strike_price, option_type)
+                    price_column = 'Low'
+                elif i in entries:
+                    sorted_date_list, expiry_dates, strike_price, option_type = entries[i]
+                    price_column = 'High'
+                else:
+                    continue  # The entry leg failed
 
                 trade_db_df.loc[row_number, 'ExpiryDates'] = ', '.join(sorted_date_list)
                 print(sorted_date_list)
                 trade_db_df.loc[row_number, 'ExpiryDates1'] = ', '.join(expiry_dates)
                 print(expiry_dates)
-
-                for j in range(1, 5):
-                    for k in range(-1500, 1600, 100):
-                        colname = f"Expiry{j} - ATM {k}"
-                        result = database_df[
-                        (database_df['Ticker'] == f"NIFTY{expiry_dates[j-1]}{strike_price+k}{option_type}.NFO") & 
-                        (database_df['Date'] == trade_date) & 
-                        (database_df['Time'] == trade_time)]['High']
-                        if len(result) > 0 & len(result) < 2:
-                            trade_db_df.loc[row_number, colname] = result.iloc[0]
-                        else:
-                            #trade_db_df.loc[row_number, colname] = f"NIFTY{expiry_dates[j-1]}{strike_price+i}{option_type}.NFO  {trade_date}-{trade_time}"
-                            trade_db_df.loc[row_number, colname] = None
-        except Exception as e:
-            print(f"Error processing trade {i}: {e}")
-            continue
+                position = trade_db_df.index.get_loc(row_number)
+                fill_leg_prices(trade_db_df, row_number, database_df, trade_day_ids[position], price_seconds[position],
+                                expiry_dates, strike_price, option_type, price_column)
+            except Exception as e:
+                print(f"Error processing trade {i}: {e}")
+                continue
 
     #print(trade_db_df.head(10))
     trade_db_df.to_csv(r'E:\Freelance work\15 - Harish backtest python script\trades 1_updated.csv', index=False)
@@ -1,6 +1,14 @@
+import json
+import os
+import shutil
+import sys
+import numpy as np
 import pandas as pd
 import re
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from glob import glob
+from itertools import repeat
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -29,15 +37,81 @@ class DateUtils:
         raise ValueError(f"Date format not recognized: {date_str}")
 
     @classmethod
-    def format_to_dd_mm_yyyy(cls, date_string):
+    def parse_date(cls, date_string):
         for fmt in cls.DATE_FORMATS:
             try:
-                parsed_date = datetime.strptime(date_string, fmt)
-                return parsed_date.strftime("%d-%m-%Y")
+                return datetime.strptime(date_string, fmt)
             except ValueError:
                 continue
         raise ValueError(f"Unable to parse date string: '{date_string}'. Please use a recognized date format.")
 
+    @classmethod
+    def format_to_dd_mm_yyyy(cls, date_string):
+        return cls.parse_date(date_string).strftime("%d-%m-%Y")
+
+    @classmethod
+    def detect_format(cls, sample):
+        """First of DATE_FORMATS that parses every string in ``sample``, or None."""
+        for fmt in cls.DATE_FORMATS:
+            try:
+                for value in sample:
+                    datetime.strptime(value, fmt)
+                return fmt
+            except ValueError:
+                continue
+        return None
+
+    @classmethod
+    def parse_dates(cls, values, sample_size=20):
+        """datetime64 Series for a column of dates in any of DATE_FORMATS.
+
+        The format is detected once from a sample of the distinct values and each
+        distinct value is parsed once with it; values it does not fit fall back to
+        the per-value search of parse_date. Missing values become NaT.
+        """
+        values = pd.Series(values)
+        if pd.api.types.is_datetime64_any_dtype(values):
+            return values
+        codes, uniques = pd.factorize(values.astype('string'))
+        uniques = list(uniques)
+        fmt = cls.detect_format(uniques[:sample_size])
+        parsed = pd.Series(pd.to_datetime(uniques, format=fmt, errors='coerce') if fmt else pd.NaT, index=range(len(uniques)),
+                           dtype='datetime64[ns]')
+        for i in np.flatnonzero(parsed.isna()):
+            parsed[i] = cls.parse_date(uniques[i])
+        # Missing values have code -1, which picks the trailing NaT
+        lookup = np.append(parsed.to_numpy(), np.datetime64('NaT'))
+        return pd.Series(lookup[codes], index=values.index)
+
+    @staticmethod
+    def day_ids(dates):
+        """int32 days since 1970-01-01 of a datetime Series (-1 where missing)."""
+        days = pd.Series(dates).to_numpy(dtype='datetime64[D]')
+        return np.where(np.isnat(days), -1, days.astype(np.int64)).astype(np.int32)
+
+    @staticmethod
+    def time_to_seconds(times):
+        """int32 seconds since midnight of 'HH:MM:SS' strings, converting each distinct time once.
+
+        Integers are taken as seconds already; missing times become -1.
+        """
+        times = pd.Series(times)
+        if pd.api.types.is_integer_dtype(times):
+            return times.to_numpy(dtype=np.int32)
+        codes, uniques = pd.factorize(times.astype('string'))
+        seconds = np.full(len(uniques) + 1, -1, dtype=np.int32)
+        if len(uniques):
+            parts = pd.Series(uniques, dtype='string').str.split(':', expand=True).astype(int)
+            seconds[:-1] = parts[0] * 3600 + parts[1] * 60 + parts[2]
+        return seconds[codes]
+
+    @staticmethod
+    def format_dates(dates, fmt):
+        """strftime of a datetime Series, formatting each distinct date once."""
+        codes, uniques = pd.factorize(dates)
+        labels = np.append(pd.DatetimeIndex(uniques).strftime(fmt).to_numpy(dtype=object), np.nan)
+        return pd.Series(list(labels[codes]), index=dates.index)
+
 class OptionSymbolParser:
     """Utility class for parsing option symbols."""
     PATTERN = r'^([A-Z]+)(\d{2}[A-Z]{3}\d{2})(\d+(?:\.\d+)?)(CE|PE)\.NFO$'
@@ -49,10 +123,25 @@ class OptionSymbolParser:
             return match.groups()
         return (None, None, None, None)
 
-    @staticmethod
-    def split_column(df, column_name):
-        return df.join(df[column_name].apply(lambda x: pd.Series(OptionSymbolParser.split_option_symbol(x)),
-                                             ).rename({0: 'Symbol', 1: 'Expiry', 2: 'Strike', 3: 'OptionType'}, axis=1))
+    @classmethod
+    def parse_symbols(cls, tickers):
+        """Symbol, Expiry (datetime), Strike (float) and OptionType columns for a ticker Series.
+
+        Each distinct ticker is parsed once and mapped back through its factorized code;
+        tickers that do not match come back as NaN.
+        """
+        codes, uniques = pd.factorize(tickers)
+        parts = pd.Series(uniques, dtype='string').str.extract(cls.PATTERN)
+        parts.columns = ['Symbol', 'Expiry', 'Strike', 'OptionType']
+        parts['Symbol'] = parts['Symbol'].astype('category')
+        parts['Expiry'] = pd.to_datetime(parts['Expiry'], format='%d%b%y', errors='coerce')
+        parts['Strike'] = parts['Strike'].astype('float64')
+        parts['OptionType'] = parts['OptionType'].astype('category')
+        return parts.reindex(codes).set_axis(tickers.index)
+
+    @classmethod
+    def split_column(cls, df, column_name):
+        return df.join(cls.parse_symbols(df[column_name]))
 
 class TradeFileReader:
     """Class for reading and cleaning trade files."""
@@ -60,32 +149,202 @@ class TradeFileReader:
     def read_trade_file(file_path):
         df = pd.read_excel(file_path, sheet_name='Sheet1', header=0)
         df['Type'] = df['Type'].astype('string')
-        df['Date/Time'] = df['Date/Time'].astype('string').map(DateUtils.format_to_dd_mm_yyyy)
+        dates = DateUtils.parse_dates(df['Date/Time'])
+        df['Date/Time'] = DateUtils.format_dates(dates, '%d-%m-%Y')
         df['time'] = df['time'].astype('string')
-        df['StringDate'] = df['Date/Time'].map(DateUtils.date_to_str).astype('string')
+        df['StringDate'] = DateUtils.format_dates(dates, '%d%b%y').str.upper().astype('string')
         df['Price INR'] = df['Price INR'].str.replace(',', '', regex=False).astype(float)
         df['Rounded Price'] = df['Price INR'].round(-2).astype(int)
         df[['Action', 'Trade_Type']] = df['Type'].str.split(expand=True)
         return df
 
     @staticmethod
-    def read_market_file(file_path):
+    def read_market_file(file_path, store=None, **filters):
+        """Parsed option-chain file, optionally narrowed by OptionChainStore.filter_frame filters.
+
+        When ``store`` holds an up-to-date copy of the file only the matching
+        partitions, times and columns are read from it; otherwise the CSV is parsed.
+        Besides the Date/Time strings every row carries integer ``DayId`` (days
+        since 1970-01-01) and ``Second`` (seconds since midnight) keys for joins.
+        """
+        if store is not None and store.has(file_path):
+            return store.read(file_path, **filters)
         df = pd.read_csv(file_path)
         df['Ticker'] = df['Ticker'].astype('string')
-        df['Date'] = df['Date'].astype('string').map(DateUtils.format_to_dd_mm_yyyy)
+        dates = DateUtils.parse_dates(df['Date'])
+        df['Date'] = DateUtils.format_dates(dates, '%d-%m-%Y')
         df['Time'] = df['Time'].astype('string')
+        df.insert(3, 'DayId', DateUtils.day_ids(dates))
+        df.insert(4, 'Second', DateUtils.time_to_seconds(df['Time']))
         df = OptionSymbolParser.split_column(df, 'Ticker')
+        return OptionChainStore.filter_frame(df, **filters) if filters else df
+
+class OptionChainStore:
+    """Columnar copy of the GFDL daily option-chain archive, partitioned by day.
+
+    Each day lives in ``<store_dir>/<YYYY>/<YYYY-MM-DD>/`` as one ``.npy`` file
+    per column. Rows are sorted by (Symbol, Expiry) and ``meta.json`` records the
+    row range of every symbol/expiry partition. Tickers are int32 codes into the
+    day's ticker list and times int32 seconds of the day, so a read memory-maps
+    only the partitions, times and columns it asks for.
+    """
+    META_FILE = 'meta.json'
+    FILE_PATTERN = re.compile(r'GFDLNFO_OPTIONS_(\d{2})(\d{2})(\d{4})\.csv$', re.IGNORECASE)
+    KEY_COLUMNS = ['Ticker', 'Date', 'Time', 'DayId', 'Second', 'Symbol', 'Expiry', 'Strike', 'OptionType']
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+
+    @classmethod
+    def file_day(cls, csv_path):
+        """'YYYY-MM-DD' day of a GFDLNFO_OPTIONS_ddmmyyyy.csv file."""
+        match = cls.FILE_PATTERN.search(os.path.basename(csv_path))
+        if not match:
+            raise ValueError(f"Not a GFDL option-chain file: {csv_path}")
+        day, month, year = match.groups()
+        return f"{year}-{month}-{day}"
+
+    def partition_dir(self, csv_path):
+        day = self.file_day(csv_path)
+        return os.path.join(self.store_dir, day[:4], day)
+
+    def _meta(self, csv_path):
+        try:
+            with open(os.path.join(self.partition_dir(csv_path), self.META_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def has(self, csv_path):
+        """True when the day of ``csv_path`` is stored and the CSV, if still present, is unchanged."""
+        meta = self._meta(csv_path)
+        if meta is None:
+            return False
+        try:
+            st = os.stat(csv_path)
+        except OSError:
+            return True  # Archive file removed; the store is the only copy
+        return meta['source_size'] == st.st_size and meta['source_mtime_ns'] == st.st_mtime_ns
+
+    def ingest(self, csv_path):
+        """Convert one daily CSV into its partition, replacing any previous copy."""
+        df = pd.read_csv(csv_path)
+        dates = df['Date'].dropna().astype('string').unique()
+        if len(dates) != 1:
+            raise ValueError(f"{csv_path}: expected one trading day, found {len(dates)}")
+        codes, tickers = pd.factorize(df['Ticker'].astype('string'))
+        parts = OptionSymbolParser.parse_symbols(pd.Series(tickers, dtype='string'))
+
+        # Partition key of every ticker, plus a trailing one for missing tickers (code -1)
+        symbols = parts['Symbol'].astype(object).where(parts['Symbol'].notna(), None)
+        expiries = parts['Expiry'].dt.strftime('%Y-%m-%d').astype(object).where(parts['Expiry'].notna(), None)
+        keys = list(zip(symbols, expiries)) + [(None, None)]
+        labels = np.array([f"{symbol or ''}|{expiry or ''}" for symbol, expiry in keys], dtype=object)[codes]
+        order = np.argsort(labels, kind='stable')
+        labels = labels[order]
+        starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])[:len(order)]
+        stops = np.r_[starts[1:], len(order)]
+        partitions = [[*keys[codes[order[start]]], int(start), int(stop)] for start, stop in zip(starts, stops)]
+
+        columns = {'Ticker': codes.astype(np.int32)[order], 'Second': DateUtils.time_to_seconds(df['Time'])[order]}
+        value_columns = [c for c in df.columns if c not in ('Ticker', 'Date', 'Time') and pd.api.types.is_numeric_dtype(df[c])]
+        for c in value_columns:
+            columns[c] = df[c].to_numpy()[order]
+
+        part_dir = self.partition_dir(csv_path)
+        tmp_dir = part_dir + '.tmp'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        for name, values in columns.items():
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), values)
+        st = os.stat(csv_path)
+        with open(os.path.join(tmp_dir, self.META_FILE), 'w') as f:
+            json.dump({
+                'source_size': st.st_size,
+                'source_mtime_ns': st.st_mtime_ns,
+                'date': DateUtils.format_to_dd_mm_yyyy(dates[0]),
+                'rows': len(order),
+                'tickers': [str(t) for t in tickers],
+                'columns': value_columns,
+                'partitions': partitions,
+            }, f)
+        shutil.rmtree(part_dir, ignore_errors=True)
+        os.replace(tmp_dir, part_dir)
+        return part_dir
+
+    def build(self, archive_dir, workers=None):
+        """Ingest every new or changed daily file of a GFDL archive; returns how many were converted."""
+        paths = sorted(glob(os.path.join(archive_dir, '*', '*', 'GFDLNFO_OPTIONS_*.csv')))
+        stale = [path for path in paths if not self.has(path)]
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(stale) <= 1:
+            list(map(self.ingest, stale))
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(stale))) as pool:
+                list(pool.map(self.ingest, stale))
+        return len(stale)
+
+    def expiries(self, csv_path):
+        """Sorted expiries of every symbol stored for the day, without reading any rows."""
+        meta = self._meta(csv_path)
+        return pd.DatetimeIndex(sorted({expiry for _, expiry, _, _ in meta['partitions'] if expiry}))
+
+    def read(self, csv_path, symbols=None, expiries=None, times=None, columns=None):
+        """The stored day as ``read_market_file`` returns it, reading only what the filters need."""
+        meta = self._meta(csv_path)
+        part_dir = self.partition_dir(csv_path)
+        load = lambda name: np.load(os.path.join(part_dir, f"{name}.npy"), mmap_mode='r')
+
+        if expiries is not None:
+            expiries = set(pd.to_datetime(list(expiries)).strftime('%Y-%m-%d'))
+        ranges = [np.arange(start, stop) for symbol, expiry, start, stop in meta['partitions']
+                  if (symbols is None or symbol in symbols) and (expiries is None or expiry in expiries)]
+        rows = np.concatenate(ranges) if ranges else np.empty(0, dtype=np.int64)
+        seconds = load('Second')[rows]
+        if times is not None:
+            keep = np.isin(seconds, DateUtils.time_to_seconds(times))
+            rows, seconds = rows[keep], seconds[keep]
+
+        unique_seconds, inverse = np.unique(seconds, return_inverse=True)
+        labels = np.array([f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}" for s in unique_seconds], dtype=object)
+        df = pd.DataFrame({
+            'Ticker': pd.Series(pd.Categorical.from_codes(load('Ticker')[rows], categories=meta['tickers'])).astype('string'),
+            'Date': [meta['date']] * len(rows),
+            'Time': pd.Series(labels[inverse], dtype='string'),
+            'DayId': np.full(len(rows), np.datetime64(datetime.strptime(meta['date'], '%d-%m-%Y'), 'D').astype(np.int64), dtype=np.int32),
+            'Second': np.asarray(seconds, dtype=np.int32),
+        })
+        for c in meta['columns']:
+            if columns is None or c in columns:
+                df[c] = load(c)[rows]
+        return OptionSymbolParser.split_column(df, 'Ticker')
+
+    @classmethod
+    def filter_frame(cls, df, symbols=None, expiries=None, times=None, columns=None):
+        """Rows of a parsed option-chain frame matching the filters, keeping only ``columns`` of the values.
+
+        ``times`` are 'HH:MM:SS' strings or seconds since midnight.
+        """
+        mask = pd.Series(True, index=df.index)
+        if symbols is not None:
+            mask &= df['Symbol'].isin(symbols)
+        if expiries is not None:
+            mask &= df['Expiry'].isin(pd.to_datetime(list(expiries)))
+        if times is not None:
+            mask &= df['Second'].isin(DateUtils.time_to_seconds(times))
+        df = df[mask]
+        if columns is not None:
+            df = df.drop(columns=[c for c in df.columns if c not in cls.KEY_COLUMNS and c not in columns])
         return df
 
 class TradeUtils:
     """Utility class for trade filtering, sorting, and validation."""
     @staticmethod
     def get_filtered_sorted_dates(df, symbol, strike, option_type, date_column='Expiry'):
-        filtered_df = df[(df['Symbol'] == symbol) & (df['Strike'] == strike) & (df['OptionType'] == option_type)]
+        filtered_df = df[(df['Symbol'] == symbol) & (df['Strike'] == float(strike)) & (df['OptionType'] == option_type)]
         if filtered_df.empty:
             return []
-        date_series = pd.to_datetime(filtered_df[date_column], format='%d%b%y', errors='coerce')
-        unique_sorted_dates = date_series.dropna().drop_duplicates().sort_values()
+        unique_sorted_dates = filtered_df[date_column].dropna().drop_duplicates().sort_values()
         return unique_sorted_dates.dt.strftime('%d%b%y').str.upper().tolist()
 
     @staticmethod
@@ -124,4 +383,171 @@ class TradeUtils:
                 'valid': False,
                 'message': f'Trade {trade_number}: Mismatched trade types: {list(trade_types)}'
             }
-        return {'valid': True, 'message': f'Trade {trade_number} is valid'} 
\ No newline at end of file
+        return {'valid': True, 'message': f'Trade {trade_number} is valid'}
+
+    @staticmethod
+    def validate_trades(df, trade_col='Trade #'):
+        """validate_single_trade for every trade at once, from a single groupby.
+
+        Returns a table indexed by trade number with ``entry_count``, ``exit_count``,
+        ``valid``, ``message`` and the ``entry_row`` / ``exit_row`` index labels of
+        each trade's first entry and exit.
+        """
+        trades = df[trade_col]
+        is_entry = df['Action'] == 'Entry'
+        is_exit = df['Action'] == 'Exit'
+        grouped = df.groupby(trade_col)
+        table = pd.DataFrame({
+            'entry_count': is_entry.groupby(trades).sum(),
+            'exit_count': is_exit.groupby(trades).sum(),
+            'trade_types': grouped['Trade_Type'].unique(),
+        })
+        table['entry_row'] = pd.Series(df.index[is_entry], index=trades[is_entry]).groupby(level=0).first().reindex(table.index).astype('Int64')
+        table['exit_row'] = pd.Series(df.index[is_exit], index=trades[is_exit]).groupby(level=0).first().reindex(table.index).astype('Int64')
+
+        counts_ok = (table['entry_count'] == 1) & (table['exit_count'] == 1)
+        types_ok = table['trade_types'].map(len) == 1
+        table['valid'] = counts_ok & types_ok
+        table['message'] = [
+            f'Trade {n} is valid' if valid else
+            f'Trade {n}: Found {entries} entries and {exits} exits (expected 1 each)' if not counts else
+            f'Trade {n}: Mismatched trade types: {list(types)}'
+            for n, entries, exits, types, counts, valid in zip(
+                table.index, table['entry_count'], table['exit_count'], table['trade_types'], counts_ok, table['valid'])
+        ]
+        return table
+
+def load_option_chain_day(path, times, store_dir=None):
+    """Sorted expiries of one daily option-chain file and its rows at ``times`` (seconds of the day).
+
+    Reads from the OptionChainStore at ``store_dir`` when it has the day. Runs in
+    a worker process; returns None when the file cannot be read.
+    """
+    store = OptionChainStore(store_dir) if store_dir else None
+    try:
+        if store is not None and store.has(path):
+            expiries = store.expiries(path)
+            df = TradeFileReader.read_market_file(path, store, symbols=[TradeEnricher.SYMBOL], times=times,
+                                                  columns=['Low', 'High'])
+        else:
+            df = TradeFileReader.read_market_file(path)
+            expiries = pd.DatetimeIndex(df['Expiry'].dropna().unique()).sort_values()
+    except (OSError, ValueError) as e:
+        print(f"Error reading {path}: {e}")
+        return None
+    rows = df.loc[df['Second'].isin(times), ['Ticker', 'DayId', 'Second', 'Low', 'High']]
+    return expiries, rows.drop_duplicates(['Ticker', 'DayId', 'Second'], keep='first')
+
+class TradeEnricher:
+    """Batch trade enrichment: option prices around every trade leg in one pass.
+
+    Produces the same wide output as ``resources/main.py``. Each trading day's
+    option-chain file is parsed once in a process pool, the prices of all legs
+    are gathered with a single merge, and the price columns are pivoted and
+    joined onto the trades at the end.
+    """
+    STRIKE_OFFSETS = np.arange(-1500, 1600, 100)
+    EXPIRY_SLOTS = 4
+    SYMBOL = 'NIFTY'
+
+    def __init__(self, base_path, workers=None, store_dir=None):
+        self.base_path = base_path
+        self.workers = workers or os.cpu_count() or 1
+        self.store_dir = store_dir
+
+    @staticmethod
+    def option_chain_path(base_path, trade_date):
+        """Path of the GFDL option-chain file for a trade date."""
+        file_name = f'{trade_date.strftime("%Y")}/{trade_date.strftime("%b_%Y").upper()}/GFDLNFO_OPTIONS_{trade_date.strftime("%d%m%Y")}.csv'
+        return os.path.join(base_path, *file_name.split('/'))
+
+    @classmethod
+    def price_columns(cls, slots):
+        return [f"Expiry{j} - ATM {k}" for j in range(1, slots + 1) for k in cls.STRIKE_OFFSETS]
+
+    @staticmethod
+    def trade_legs(trades):
+        """Entry and exit rows of every valid trade, with the option price time of each."""
+        validation = TradeUtils.validate_trades(trades)
+        valid = validation[validation['valid']]
+        rows = pd.concat([valid['entry_row'], valid['exit_row']]).to_numpy(dtype=trades.index.dtype)
+        legs = trades.loc[rows, ['Trade #', 'Action', 'Trade_Type', 'Date/Time', 'time', 'Rounded Price']]
+        legs = legs.rename(columns={'Date/Time': 'Date'}).rename_axis('Row').reset_index()
+        legs['Day'] = pd.to_datetime(legs['Date'], format='%d-%m-%Y')
+        legs['DayId'] = DateUtils.day_ids(legs['Day'])
+        # Option prices are read one second before the trade time (wrapping at midnight)
+        legs['Second'] = (DateUtils.time_to_seconds(legs['time']) - 1) % 86400
+        return legs
+
+    def load_days(self, legs):
+        """load_option_chain_day for every trading day of ``legs``, keyed by day."""
+        times = legs.groupby('Day')['Second'].unique()
+        paths = [self.option_chain_path(self.base_path, day) for day in times.index]
+        if self.workers == 1 or len(paths) <= 1:
+            results = list(map(load_option_chain_day, paths, times, repeat(self.store_dir)))
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(paths))) as pool:
+                results = list(pool.map(load_option_chain_day, paths, times, repeat(self.store_dir)))
+        return {day: result for day, result in zip(times.index, results) if result is not None}
+
+    def resolve_legs(self, legs, days):
+        """Expiries, strike and option type of each leg, taken from its trade's entry.
+
+        Legs whose day file, or whose entry's day file, is missing are dropped.
+        """
+        legs = legs[legs['Day'].isin(days.keys())]
+        entries = legs[legs['Action'] == 'Entry']
+        expiry_info = {}
+        for day in entries['Day'].unique():
+            expiries = days[day][0]
+            closest = expiries[expiries >= day][:self.EXPIRY_SLOTS].strftime('%d%b%y').str.upper()
+            expiry_info[day] = (', '.join(expiries.strftime('%d%b%y')), ', '.join(closest), list(closest))
+        info = pd.DataFrame(list(entries['Day'].map(expiry_info)), columns=['ExpiryDates', 'ExpiryDates1', 'Expiries'])
+        info['Trade #'] = entries['Trade #'].to_numpy()
+        info['Strike'] = entries['Rounded Price'].to_numpy()
+        info['OptionType'] = np.where(entries['Trade_Type'] == 'short', 'CE', 'PE')
+        return legs.merge(info, on='Trade #')
+
+    def leg_prices(self, legs, days):
+        """Long frame of (Row, Column, Price) for every expiry/strike combination of every leg."""
+        grid = legs[['Row', 'Action', 'DayId', 'Second', 'Expiries', 'Strike', 'OptionType']].explode('Expiries').dropna(subset=['Expiries'])
+        grid['Slot'] = grid.groupby('Row').cumcount() + 1
+        grid = grid.merge(pd.DataFrame({'Offset': self.STRIKE_OFFSETS}), how='cross')
+        grid['Ticker'] = (self.SYMBOL + grid['Expiries'] + (grid['Strike'] + grid['Offset']).astype(str)
+                          + grid['OptionType'] + '.NFO')
+        grid['Column'] = 'Expiry' + grid['Slot'].astype(str) + ' - ATM ' + grid['Offset'].astype(str)
+
+        chain = pd.concat([rows for _, rows in days.values()] or [pd.DataFrame(columns=['Ticker', 'DayId', 'Second', 'Low', 'High'])],
+                          ignore_index=True)
+        chain['Ticker'] = chain['Ticker'].astype(object)
+        grid = grid.merge(chain, on=['Ticker', 'DayId', 'Second'], how='left')
+        # Entries are priced at the low of the bar, exits at the high
+        grid['Price'] = np.where(grid['Action'] == 'Entry', grid['Low'], grid['High'])
+        return grid[['Row', 'Column', 'Slot', 'Price']]
+
+    def enrich(self, trades):
+        """``trades`` with ExpiryDates, ExpiryDates1 and the option price columns added."""
+        legs = self.trade_legs(trades)
+        days = self.load_days(legs)
+        legs = self.resolve_legs(legs, days)
+        prices = self.leg_prices(legs, days)
+
+        slots = int(prices['Slot'].max()) if len(prices) else 0
+        wide = prices.pivot(index='Row', columns='Column', values='Price').reindex(columns=self.price_columns(slots))
+        columns = legs.set_index('Row')[['ExpiryDates', 'ExpiryDates1']].join(wide)
+        return trades.join(columns)
+
+DATABASE_PATH = r'E:\Database'
+STORE_PATH = r'E:\Database_store'
+
+def main():
+    trades = TradeFileReader.read_trade_file(r'E:\trades 1.xlsx')
+    enriched = TradeEnricher(DATABASE_PATH, store_dir=STORE_PATH).enrich(trades)
+    enriched.to_csv(r'E:\Freelance work\15 - Harish backtest python script\trades 1_updated.csv', index=False)
+
+if __name__ == "__main__":
+    # `python optimized.py build` converts new or changed archive files into the store
+    if sys.argv[1:] == ['build']:
+        print(f"Ingested {OptionChainStore(STORE_PATH).build(DATABASE_PATH)} files")
+    else:
+        main()
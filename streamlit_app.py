@@ -4,11 +4,14 @@ import numpy as np
 import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
+import hashlib
 import requests
 import json
 import os
 from datetime import datetime, time, timedelta
 import io
+from time import sleep
+from backend.metrics import drawdown_series, max_consecutive_losses, sharpe_ratio, value_at_risk
 
 # Page configuration
 st.set_page_config(
@@ -87,20 +90,43 @@ def check_backend_connection():
         return False
 
 def upload_file_to_backend(file, endpoint):
-    """Upload file to FastAPI backend"""
+    """Upload file to FastAPI backend, skipping the bytes if it already has them"""
     try:
-        files = {"file": (file.name, file.getvalue(), file.type)}
-        response = requests.post(f"{BACKEND_URL}/{endpoint}", files=files, timeout=30)
+        data = file.getvalue()
+        digest = hashlib.sha256(data).hexdigest()
+        known = requests.head(f"{BACKEND_URL}/{endpoint}/{digest}", timeout=10)
+        if known.status_code == 200:
+            response = requests.post(f"{BACKEND_URL}/{endpoint}/{digest}", data={"filename": file.name}, timeout=30)
+        else:
+            files = {"file": (file.name, data, file.type)}
+            response = requests.post(f"{BACKEND_URL}/{endpoint}", files=files, timeout=30)
         return response.json() if response.status_code == 200 else None
     except Exception as e:
         st.error(f"Error uploading file: {str(e)}")
         return None
 
-def run_backtest_api(config):
-    """Run backtest via API"""
+def run_backtest_api(config, poll_interval=1.0, max_wait=3600):
+    """Run backtest via the API job queue and wait for the result"""
     try:
-        response = requests.post(f"{BACKEND_URL}/backtest/run", json=config)
-        return response.json() if response.status_code == 200 else None
+        response = requests.post(f"{BACKEND_URL}/backtest/submit", json=config, timeout=30)
+        if response.status_code != 200:
+            return None
+        job_id = response.json()["job_id"]
+
+        deadline = datetime.now() + timedelta(seconds=max_wait)
+        while datetime.now() < deadline:
+            status = requests.get(f"{BACKEND_URL}/backtest/{job_id}/status", timeout=10).json()
+            if status["status"] == "done":
+                response = requests.get(f"{BACKEND_URL}/backtest/{job_id}/result", timeout=60)
+                return response.json() if response.status_code == 200 else None
+            if status["status"] in ("failed", "cancelled"):
+                st.error(f"Backtest {status['status']}: {status.get('error') or ''}")
+                return None
+            sleep(poll_interval)
+
+        requests.post(f"{BACKEND_URL}/backtest/{job_id}/cancel", timeout=10)
+        st.error("Backtest timed out")
+        return None
     except Exception as e:
         st.error(f"Error running backtest: {str(e)}")
         return None
@@ -387,10 +413,8 @@ def show_results(result):
         st.metric("Profit Factor", profit_factor_display)
     
     with col4:
-        # Calculate Sharpe ratio (simplified)
-        if equity_curve:
-            returns = np.diff(equity_curve)
-            sharpe = np.mean(returns) / np.std(returns) * np.sqrt(252) if np.std(returns) > 0 else 0
+        if trade_log:
+            sharpe = sharpe_ratio([t['pnl'] for t in trade_log])
             st.metric("Sharpe Ratio", f"{sharpe:.2f}")
     
     # Charts
@@ -564,9 +588,7 @@ def show_analytics_page():
         with col1:
             # Drawdown analysis
             if equity_curve:
-                running_max = np.maximum.accumulate(equity_curve)
-                drawdown = np.array(equity_curve) - running_max
-                max_dd = np.min(drawdown)
+                drawdown = drawdown_series(equity_curve)
                 
                 fig_dd = go.Figure()
                 fig_dd.add_trace(go.Scatter(
@@ -581,14 +603,11 @@ def show_analytics_page():
         
         with col2:
             # Risk metrics
-            returns = np.diff(equity_curve) if equity_curve else []
-            if len(returns) > 0:
-                var_95 = np.percentile(returns, 5)
-                var_99 = np.percentile(returns, 1)
-                
-                st.metric("VaR (95%)", f"₹{var_95:.2f}")
-                st.metric("VaR (99%)", f"₹{var_99:.2f}")
-                st.metric("Max Consecutive Losses", calculate_max_consecutive_losses(trade_log))
+            pnl = [t['pnl'] for t in trade_log]
+            if pnl:
+                st.metric("VaR (95%)", f"₹{value_at_risk(pnl, 0.95):.2f}")
+                st.metric("VaR (99%)", f"₹{value_at_risk(pnl, 0.99):.2f}")
+                st.metric("Max Consecutive Losses", max_consecutive_losses(pnl))
         
         with col3:
             # Trade statistics
@@ -603,23 +622,6 @@ def show_analytics_page():
                 st.metric("Average Loss", f"₹{avg_loss:.2f}")
                 st.metric("Win/Loss Ratio", f"{abs(avg_win/avg_loss):.2f}")
 
-def calculate_max_consecutive_losses(trade_log):
-    """Calculate maximum consecutive losses"""
-    if not trade_log:
-        return 0
-    
-    max_consecutive = 0
-    current_consecutive = 0
-    
-    for trade in trade_log:
-        if trade['pnl'] <= 0:
-            current_consecutive += 1
-            max_consecutive = max(max_consecutive, current_consecutive)
-        else:
-            current_consecutive = 0
-    
-    return max_consecutive
-
 def show_settings_page():
     """Application settings"""
     st.markdown("## ⚙️ Settings")